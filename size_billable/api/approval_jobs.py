@@ -0,0 +1,174 @@
+import frappe
+from frappe import _
+from frappe.utils import now_datetime, get_datetime, time_diff_in_seconds
+
+# Batches larger than this are processed by a background job instead of the request
+BACKGROUND_JOB_THRESHOLD = 500
+CHUNK_SIZE = 200
+
+JOB_CACHE_PREFIX = "size_billable:approval_job:"
+JOB_EXPIRY = 7 * 24 * 60 * 60
+PROGRESS_EVENT = "size_billable_job_progress"
+
+# A running or queued job without a heartbeat for this long is treated as dead (worker killed or timed out)
+STALE_JOB_SECONDS = 15 * 60
+
+def enqueue_background_job(kind, entries, project_name=None, action=None):
+    """Store a job record and enqueue it; kind is "approval" (list of names) or "hours" (name -> hours)"""
+    job_id = frappe.generate_hash(length=12)
+    job = {
+        "job_id": job_id,
+        "kind": kind,
+        "user": frappe.session.user,
+        "project_name": project_name,
+        "action": action,
+        "entries": entries,
+        "total": len(entries),
+        "processed": 0,
+        "results": {},
+        "status": "Queued",
+        "error": None,
+        "created_on": str(now_datetime())
+    }
+    save_job(job)
+    enqueue_job(job_id)
+
+    return {
+        "queued": True,
+        "job_id": job_id,
+        "total": job["total"],
+        "message": _("{0} entries are being processed in the background").format(job["total"])
+    }
+
+def enqueue_job(job_id):
+    """Enqueue (or re-enqueue) a stored job on the long queue"""
+    frappe.enqueue(
+        "size_billable.api.approval_jobs.run_background_job",
+        queue="long",
+        timeout=60 * 60,
+        enqueue_after_commit=True,
+        approval_job=job_id
+    )
+
+def run_background_job(approval_job):
+    """Process a stored job in chunks, committing and publishing progress after each chunk"""
+    from size_billable.api.project import apply_approval_action, apply_consumed_hours_deltas
+    from size_billable.api.timesheet_detail import apply_hour_update
+
+    job = get_job(approval_job)
+    if not job or job["status"] == "Completed":
+        return
+
+    job["status"] = "Running"
+    job["error"] = None
+    save_job(job)
+
+    names = job["entries"] if job["kind"] == "approval" else list(job["entries"])
+
+    try:
+        # Resume after the last committed chunk
+        while job["processed"] < job["total"]:
+            chunk = names[job["processed"]:job["processed"] + CHUNK_SIZE]
+            deltas = {}
+
+            for detail_name in chunk:
+                if job["kind"] == "approval":
+                    result = apply_approval_action(detail_name, job["user"], job["action"], deltas)
+                else:
+                    result = apply_hour_update(detail_name, job["entries"][detail_name], job["user"], deltas)
+                job["results"][detail_name] = result
+
+            # Project hours move with each chunk, so a resumed job never counts hours twice
+            apply_consumed_hours_deltas(deltas)
+            frappe.db.commit()
+
+            job["processed"] += len(chunk)
+            save_job(job)
+            publish_progress(job)
+
+        job["status"] = "Completed"
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Error in approval job {approval_job}: {str(e)}")
+        job["status"] = "Failed"
+        job["error"] = str(e)
+
+    save_job(job)
+    publish_progress(job)
+
+def publish_progress(job):
+    """Push job progress to the user who started it"""
+    frappe.publish_realtime(PROGRESS_EVENT, {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "action": job["action"],
+        "status": job["status"],
+        "processed": job["processed"],
+        "total": job["total"],
+        "error": job["error"]
+    }, user=job["user"])
+
+def get_job(job_id):
+    return frappe.cache().get_value(JOB_CACHE_PREFIX + job_id)
+
+def save_job(job):
+    # Saved after every chunk, so updated_on doubles as the job's heartbeat
+    job["updated_on"] = str(now_datetime())
+    frappe.cache().set_value(JOB_CACHE_PREFIX + job["job_id"], job, expires_in_sec=JOB_EXPIRY)
+
+def is_stale(job):
+    updated_on = job.get("updated_on") or job.get("created_on")
+    return time_diff_in_seconds(now_datetime(), get_datetime(updated_on)) > STALE_JOB_SECONDS
+
+def get_own_job(job_id):
+    """Get a job record, allowing only the user who started it"""
+    job = get_job(job_id)
+    if not job:
+        frappe.throw(_("Background job {0} not found or expired").format(job_id))
+    if job["user"] != frappe.session.user:
+        frappe.throw(_("You can only access your own background jobs"))
+    return job
+
+@frappe.whitelist()
+def get_background_job_result(job_id):
+    """Get the status and per-entry results of a background approval or hour-edit job"""
+    job = get_own_job(job_id)
+
+    summary = {}
+    for result in job["results"].values():
+        key = result.split(":", 1)[0]
+        summary[key] = summary.get(key, 0) + 1
+
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "action": job["action"],
+        "status": job["status"],
+        "processed": job["processed"],
+        "total": job["total"],
+        "error": job["error"],
+        "updated_on": job.get("updated_on"),
+        "stale": job["status"] in ("Queued", "Running") and is_stale(job),
+        "summary": summary,
+        "results": job["results"]
+    }
+
+@frappe.whitelist()
+def resume_background_job(job_id):
+    """Re-enqueue a failed job, or one whose worker died; chunks that were already committed are skipped
+    
+    Re-running the chunk a dead worker was in is safe: approving an approved entry adds no
+    hours and an hour edit to the same value has no delta.
+    """
+    job = get_own_job(job_id)
+    resumable = job["status"] == "Failed" or (job["status"] in ("Queued", "Running") and is_stale(job))
+    if not resumable:
+        frappe.throw(_("Only failed jobs, or jobs without progress for {0} minutes, can be resumed").format(
+            STALE_JOB_SECONDS // 60))
+
+    job["status"] = "Queued"
+    save_job(job)
+    enqueue_job(job_id)
+
+    return {"queued": True, "job_id": job_id, "processed": job["processed"], "total": job["total"]}
@@ -0,0 +1,167 @@
+import json
+
+import frappe
+from frappe.utils import cint, flt, get_datetime, now_datetime
+
+# Upper bounds (hours) of the time-to-approve histogram buckets; a last bucket holds everything longer
+LATENCY_BUCKETS = (1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720)
+
+def record_approval_latency(detail, approver):
+    """Add the time an entry waited for approval to its approver's running statistics
+
+    Statistics are kept per approver and project as a count, a total, a maximum and a
+    histogram, so percentiles never need the approval history. This is secondary bookkeeping:
+    it runs in a savepoint and a failure is logged without affecting the approval itself.
+    """
+    if not detail.project or not detail.submitted_on or not detail.approved_on:
+        return
+
+    hours = max((get_datetime(detail.approved_on) - get_datetime(detail.submitted_on)).total_seconds() / 3600, 0)
+
+    frappe.db.savepoint("size_billable_approval_latency")
+    try:
+        update_latency_stat(approver, detail.project, hours, detail.approved_on)
+    except Exception as e:
+        frappe.db.rollback(save_point="size_billable_approval_latency")
+        frappe.log_error(f"Error recording approval latency of {detail.name}: {str(e)}")
+
+def update_latency_stat(approver, project, hours, approved_on):
+    now = now_datetime()
+
+    # The unique (approver, project) key makes a concurrent first approval wait and skip its insert
+    # instead of creating a duplicate row
+    frappe.db.sql("""
+        INSERT IGNORE INTO `tabApproval Latency Stat`
+            (name, creation, modified, owner, modified_by, docstatus,
+             approver, project, approved_count, total_hours, max_hours, histogram)
+        VALUES (%(name)s, %(now)s, %(now)s, 'Administrator', 'Administrator', 0,
+            %(approver)s, %(project)s, 0, 0, 0, %(histogram)s)
+    """, {"name": frappe.generate_hash(length=10), "now": now, "approver": approver,
+          "project": project, "histogram": json.dumps(new_histogram())})
+
+    # Lock the row so concurrent approvals do not lose histogram counts
+    stat = frappe.db.sql("""
+        SELECT name, histogram
+        FROM `tabApproval Latency Stat`
+        WHERE approver = %s
+        AND project = %s
+        FOR UPDATE
+    """, (approver, project), as_dict=True)[0]
+
+    histogram = load_histogram(stat.histogram)
+    histogram[get_bucket(hours)] += 1
+
+    frappe.db.sql("""
+        UPDATE `tabApproval Latency Stat`
+        SET approved_count = approved_count + 1,
+            total_hours = total_hours + %(hours)s,
+            max_hours = GREATEST(max_hours, %(hours)s),
+            last_approved_on = %(approved_on)s,
+            histogram = %(histogram)s,
+            modified = %(now)s
+        WHERE name = %(name)s
+    """, {"hours": hours, "approved_on": approved_on, "histogram": json.dumps(histogram),
+          "now": now, "name": stat.name})
+
+def new_histogram():
+    return [0] * (len(LATENCY_BUCKETS) + 1)
+
+def load_histogram(value):
+    histogram = new_histogram()
+    for i, count in enumerate(json.loads(value or "[]")[:len(histogram)]):
+        histogram[i] = cint(count)
+    return histogram
+
+def merge_histograms(histograms):
+    merged = new_histogram()
+    for histogram in histograms:
+        for i, count in enumerate(histogram):
+            merged[i] += count
+    return merged
+
+def get_bucket(hours):
+    for i, upper in enumerate(LATENCY_BUCKETS):
+        if hours <= upper:
+            return i
+    return len(LATENCY_BUCKETS)
+
+def get_percentile(histogram, percentile, max_hours):
+    """Upper bound of the bucket holding the percentile, capped at the longest wait seen"""
+    total = sum(histogram)
+    if not total:
+        return 0
+
+    target = total * percentile / 100.0
+    cumulative = 0
+    for i, count in enumerate(histogram):
+        cumulative += count
+        if cumulative >= target:
+            upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else max_hours
+            return min(flt(upper), flt(max_hours))
+    return flt(max_hours)
+
+def get_latency_stats(projects=None):
+    """Get every approver/project statistics row, optionally limited to projects"""
+    filters = {"project": ["in", projects]} if projects is not None else {}
+    rows = frappe.get_all("Approval Latency Stat",
+        filters=filters,
+        fields=["approver", "project", "approved_count", "total_hours", "max_hours", "histogram"]
+    )
+    for row in rows:
+        row.histogram = load_histogram(row.histogram)
+    return rows
+
+def get_pending_queue(projects=None):
+    """Get the pending count and oldest submission of each project's approval queue
+
+    Only pending entries are read. Entries submitted before submission times were recorded
+    fall back to the timesheet's last modification.
+    """
+    conditions = ""
+    params = {}
+    if projects is not None:
+        if not projects:
+            return []
+        conditions = "AND tsd.project IN %(projects)s"
+        params["projects"] = projects
+
+    return frappe.db.sql(f"""
+        SELECT
+            tsd.project,
+            p.project_manager_user as approver,
+            COUNT(*) as pending_count,
+            MIN(IFNULL(tsd.submitted_on, ts.modified)) as oldest_pending_on
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        INNER JOIN `tabProject` p ON tsd.project = p.name
+        WHERE tsd.approval_status = 'Pending'
+        AND ts.status = 'Submitted'
+        {conditions}
+        GROUP BY tsd.project, p.project_manager_user
+    """, params, as_dict=True)
+
+def get_latency_overview():
+    """Site-wide time-to-approve percentiles and age of the oldest pending entry, in hours"""
+    stats = get_latency_stats()
+    histogram = merge_histograms(row.histogram for row in stats)
+    max_hours = max([flt(row.max_hours) for row in stats] or [0])
+
+    oldest_pending_on = frappe.db.sql("""
+        SELECT MIN(IFNULL(tsd.submitted_on, ts.modified))
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        WHERE tsd.approval_status = 'Pending'
+        AND ts.status = 'Submitted'
+    """)[0][0]
+
+    return {
+        "approved_count": sum(histogram),
+        "p50_hours": get_percentile(histogram, 50, max_hours),
+        "p90_hours": get_percentile(histogram, 90, max_hours),
+        "oldest_pending_hours": get_age_hours(oldest_pending_on)
+    }
+
+def get_age_hours(since):
+    if not since:
+        return 0
+    return flt((now_datetime() - get_datetime(since)).total_seconds() / 3600, 1)
@@ -0,0 +1,76 @@
+import frappe
+from frappe import _
+from frappe.utils import nowdate
+from frappe.utils.caching import request_cache
+
+APPROVABLE_PROJECTS_CACHE_KEY = "size_billable:approvable_projects"
+
+@request_cache
+def get_approvable_projects(user=None):
+    """Get the projects a user may approve: those they manage plus active Project Approver assignments
+
+    The set is cached per user for the day, since date-ranged delegations change with the date,
+    and memoized for the request so bulk operations check rows against it in memory.
+    """
+    user = user or frappe.session.user
+    today = nowdate()
+
+    cached = frappe.cache().hget(APPROVABLE_PROJECTS_CACHE_KEY, user)
+    if cached and cached.get("date") == today:
+        return frozenset(cached["projects"])
+
+    projects = frappe.db.sql(get_approvable_projects_query(user), pluck=True)
+
+    frappe.cache().hset(APPROVABLE_PROJECTS_CACHE_KEY, user, {"date": today, "projects": projects})
+    return frozenset(projects)
+
+def get_approvable_projects_query(user=None):
+    """SQL subquery selecting the projects a user may approve, for joinable IN (...) conditions"""
+    user = frappe.db.escape(user or frappe.session.user)
+    today = frappe.db.escape(nowdate())
+
+    return f"""
+        SELECT name
+        FROM `tabProject`
+        WHERE project_manager_user = {user}
+        UNION
+        SELECT project
+        FROM `tabProject Approver`
+        WHERE approver = {user}
+        AND IFNULL(from_date, {today}) <= {today}
+        AND IFNULL(to_date, {today}) >= {today}
+    """
+
+def can_approve(project_name, user=None):
+    return bool(project_name) and project_name in get_approvable_projects(user or frappe.session.user)
+
+def validate_can_approve(project_name, user=None):
+    if not can_approve(project_name, user):
+        frappe.throw(_("You can only approve entries for projects you manage or approve"), frappe.PermissionError)
+
+def clear_approvable_projects_cache(users):
+    """Drop the cached approvable projects of users once the transaction commits"""
+    users = {user for user in users if user}
+    if not users:
+        return
+
+    pending = frappe.flags.get("size_billable_pending_approver_users")
+    if pending is None:
+        pending = frappe.flags.size_billable_pending_approver_users = set()
+        frappe.db.after_commit.add(flush_approvable_projects_cache)
+        frappe.db.after_rollback.add(discard_approvable_projects_cache)
+    pending.update(users)
+
+def flush_approvable_projects_cache():
+    users = frappe.flags.pop("size_billable_pending_approver_users", None) or set()
+    cache = frappe.cache()
+    for user in users:
+        cache.hdel(APPROVABLE_PROJECTS_CACHE_KEY, user)
+
+def discard_approvable_projects_cache():
+    frappe.flags.pop("size_billable_pending_approver_users", None)
+
+def clear_project_manager_cache(doc, method):
+    """Project on_update/on_trash: the old and new manager's approvable projects change"""
+    previous = doc.get_doc_before_save()
+    clear_approvable_projects_cache([doc.project_manager_user, previous and previous.project_manager_user])
@@ -0,0 +1,152 @@
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, nowdate, now_datetime, add_months, get_first_day
+from size_billable.api.versioning import invalidate_project_billing
+from size_billable.api.search import SEARCH_TABLE
+
+ARCHIVE_TABLE = "tabArchived Timesheet Detail"
+
+# Months kept in the hot tables; override with "size_billable_archive_after_months" in site config
+DEFAULT_ARCHIVE_AFTER_MONTHS = 24
+
+SUMMARY_FIELDS = ("name", "creation", "modified", "owner", "modified_by", "project", "customer",
+    "period", "period_start", "employee", "employee_name", "entry_count", "approved_count",
+    "rejected_count", "hours", "billable_hours", "non_billable_hours", "approved_billable_hours",
+    "billable_amount", "archived_on")
+
+def archive_cold_timesheet_details():
+    """Monthly task moving closed Timesheet Details past the horizon into the archive table
+
+    Only whole months whose billing period is closed are archived, and approved billable entries
+    of hourly projects only once they are invoiced. Archived approved entries stay
+    available to the portal through the period snapshots, and their totals through
+    Archived Billing Summary. Each project is archived and committed on its own.
+    """
+    horizon = get_archive_horizon()
+    ensure_archive_table()
+
+    projects = frappe.db.sql_list("""
+        SELECT DISTINCT tsd.project
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        WHERE tsd.billing_period_closed = 1
+        AND ts.start_date < %s
+        ORDER BY tsd.project
+    """, horizon)
+
+    archived_rows = 0
+    for project_name in projects:
+        try:
+            archived_rows += archive_project(project_name, horizon)
+            frappe.db.commit()
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.logger().error(f"Error archiving timesheet details of project {project_name}: {str(e)}")
+
+    frappe.logger().info(f"Archived {archived_rows} timesheet details of {len(projects)} projects")
+
+def archive_project(project_name, horizon):
+    """Summarize, copy and delete a project's archivable rows with set-based statements"""
+    params = {"project": project_name, "horizon": horizon}
+    archivable = """
+        tsd.project = %(project)s
+        AND tsd.billing_period_closed = 1
+        AND ts.start_date < %(horizon)s
+    """
+
+    # Approved billable hours of hourly projects stay until invoiced, or invoicing could never bill them
+    if frappe.db.get_value("Project", project_name, "billing_type") == "Hourly Billing":
+        archivable += """
+        AND (
+            tsd.approval_status != 'Approved'
+            OR IFNULL(tsd.billable_hours, 0) = 0
+            OR IFNULL(tsd.sales_invoice, '') != ''
+        )
+    """
+
+    summaries = frappe.db.sql(f"""
+        SELECT
+            tsd.project,
+            p.customer,
+            DATE_FORMAT(ts.start_date, '%%Y-%%m') as period,
+            ts.employee,
+            MAX(ts.employee_name) as employee_name,
+            COUNT(*) as entry_count,
+            SUM(tsd.approval_status = 'Approved') as approved_count,
+            SUM(tsd.approval_status = 'Rejected') as rejected_count,
+            SUM(tsd.hours) as hours,
+            SUM(tsd.billable_hours) as billable_hours,
+            SUM(tsd.non_billable_hours) as non_billable_hours,
+            SUM(IF(tsd.approved_by IS NOT NULL AND ts.status = 'Submitted', tsd.billable_hours, 0))
+                as approved_billable_hours,
+            SUM(IF(tsd.approved_by IS NOT NULL AND ts.status = 'Submitted', tsd.billing_amount, 0))
+                as billable_amount
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        INNER JOIN `tabProject` p ON tsd.project = p.name
+        WHERE {archivable}
+        GROUP BY period, ts.employee
+    """, params, as_dict=True)
+
+    if not summaries:
+        return 0
+
+    now = now_datetime()
+    user = frappe.session.user
+    frappe.db.bulk_insert("Archived Billing Summary", SUMMARY_FIELDS, [
+        (frappe.generate_hash(length=10), now, now, user, user, row.project, row.customer,
+         row.period, getdate(f"{row.period}-01"), row.employee, row.employee_name, row.entry_count,
+         row.approved_count, row.rejected_count, flt(row.hours), flt(row.billable_hours),
+         flt(row.non_billable_hours), flt(row.approved_billable_hours), flt(row.billable_amount), now)
+        for row in summaries
+    ])
+
+    columns = get_archive_columns()
+    column_list = ", ".join(f"`{column}`" for column in columns)
+    frappe.db.sql(f"""
+        INSERT INTO `{ARCHIVE_TABLE}` ({column_list})
+        SELECT {", ".join(f"tsd.`{column}`" for column in columns)}
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        WHERE {archivable}
+    """, params)
+
+    # Search rows are named after the details they index
+    frappe.db.sql(f"""
+        DELETE se
+        FROM `{SEARCH_TABLE}` se
+        INNER JOIN `tabTimesheet Detail` tsd ON se.name = tsd.name
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        WHERE {archivable}
+    """, params)
+
+    frappe.db.sql(f"""
+        DELETE tsd
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        WHERE {archivable}
+    """, params)
+
+    invalidate_project_billing([project_name])
+    return sum(row.entry_count for row in summaries)
+
+def get_archive_horizon():
+    """First day of the oldest month that stays in the hot tables"""
+    months = frappe.conf.get("size_billable_archive_after_months") or DEFAULT_ARCHIVE_AFTER_MONTHS
+    return get_first_day(add_months(nowdate(), -int(months)))
+
+def ensure_archive_table():
+    """Create the archive table with the Timesheet Detail layout (DDL commits, so run it before any writes)"""
+    frappe.db.sql_ddl(f"CREATE TABLE IF NOT EXISTS `{ARCHIVE_TABLE}` LIKE `tabTimesheet Detail`")
+
+def get_archive_columns():
+    """Columns present in both tables, so fields added after the archive was created are skipped"""
+    archive_columns = set(frappe.db.sql_list(f"SHOW COLUMNS FROM `{ARCHIVE_TABLE}`"))
+    return [column for column in frappe.db.get_table_columns("Timesheet Detail") if column in archive_columns]
+
+def validate_timesheet_not_archived(doc):
+    """Reject cancelling a timesheet whose entries were moved to the archive"""
+    if frappe.db.table_exists("Archived Timesheet Detail", cached=False) and frappe.db.sql(
+        f"SELECT 1 FROM `{ARCHIVE_TABLE}` WHERE parent = %s LIMIT 1", doc.name
+    ):
+        frappe.throw(_("Timesheet {0} has archived entries and cannot be cancelled").format(doc.name))
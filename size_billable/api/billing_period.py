@@ -0,0 +1,177 @@
+import calendar
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, nowdate, now_datetime, get_last_day
+from size_billable.api.versioning import invalidate_project_billing
+
+CLOSING_ROLES = ("System Manager", "Accounts Manager")
+
+# Projects closed per transaction
+CLOSE_CHUNK_SIZE = 200
+
+@frappe.whitelist()
+def close_billing_period(period, projects=None):
+    """Close a billing month ("YYYY-MM"), freezing each project's approved entries into a snapshot
+
+    Projects with entries still pending approval are skipped, as are projects already closed
+    for the month. Every entry of a closed project-month is locked against hour edits and approvals.
+    """
+    frappe.only_for(CLOSING_ROLES)
+
+    period, from_date, to_date = get_period_dates(period)
+    if period >= nowdate()[:7]:
+        frappe.throw(_("Only past months can be closed"))
+
+    projects = frappe.parse_json(projects) if projects else None
+
+    # One grouped query finds the candidate projects and their pending entries
+    conditions = ""
+    params = {"from_date": from_date, "to_date": to_date, "period": period}
+    if projects:
+        conditions = "AND tsd.project IN %(projects)s"
+        params["projects"] = projects
+
+    candidates = frappe.db.sql(f"""
+        SELECT
+            tsd.project,
+            SUM(tsd.approval_status = 'Pending') as pending_count
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        WHERE ts.status = 'Submitted'
+        AND ts.start_date BETWEEN %(from_date)s AND %(to_date)s
+        AND IFNULL(tsd.project, '') != ''
+        {conditions}
+        AND NOT EXISTS (
+            SELECT 1 FROM `tabBilling Period Snapshot` bps
+            WHERE bps.project = tsd.project AND bps.period = %(period)s
+        )
+        GROUP BY tsd.project
+        ORDER BY tsd.project
+    """, params, as_dict=True)
+
+    skipped = {row.project: _("{0} entries pending approval").format(int(row.pending_count))
+        for row in candidates if row.pending_count}
+    to_close = [row.project for row in candidates if not row.pending_count]
+
+    closed = []
+    for start in range(0, len(to_close), CLOSE_CHUNK_SIZE):
+        chunk = to_close[start:start + CLOSE_CHUNK_SIZE]
+        create_period_snapshots(chunk, period, from_date, to_date)
+        frappe.db.commit()
+        closed.extend(chunk)
+
+    return {
+        "message": _("Closed {0} projects for {1}").format(len(closed), period),
+        "closed": closed,
+        "skipped": skipped
+    }
+
+def create_period_snapshots(project_names, period, from_date, to_date):
+    """Snapshot and lock the month's entries of projects with one read and one update"""
+    from size_billable.api.customer_portal import get_approved_entries, build_columnar_billing_data
+
+    entries_by_project = {name: [] for name in project_names}
+    for entry in get_approved_entries(project_names, from_date, to_date):
+        entries_by_project[entry.project].append(entry)
+
+    project_details = {p.name: p for p in frappe.get_all("Project",
+        filters={"name": ["in", project_names]},
+        fields=["name", "customer", "hourly_rate"]
+    )}
+
+    month_label = f"{calendar.month_name[from_date.month]} {from_date.year}"
+    closed_on = now_datetime()
+
+    for project_name in project_names:
+        entries = entries_by_project[project_name]
+        project = project_details.get(project_name) or frappe._dict()
+        total_billable_hours = flt(sum(flt(entry.billable_hours) for entry in entries), 2)
+
+        frappe.get_doc({
+            "doctype": "Billing Period Snapshot",
+            "project": project_name,
+            "customer": project.customer,
+            "period": period,
+            "from_date": from_date,
+            "to_date": to_date,
+            "entry_count": len(entries),
+            "total_billable_hours": total_billable_hours,
+            "hourly_rate": flt(project.hourly_rate),
+            "total_billable_amount": flt(sum(flt(entry.billing_amount) for entry in entries), 2),
+            "closed_by": frappe.session.user,
+            "closed_on": closed_on,
+            "data": json.dumps(build_columnar_billing_data(entries, period, month_label), separators=(",", ":"))
+        }).insert(ignore_permissions=True)
+
+    set_entries_closed(project_names, from_date, to_date, 1)
+    invalidate_project_billing(project_names)
+
+@frappe.whitelist()
+def reopen_billing_period(project, period):
+    """Reopen a closed project-month: drop its snapshot and unlock its entries"""
+    frappe.only_for(CLOSING_ROLES)
+
+    period, from_date, to_date = get_period_dates(period)
+    snapshot = frappe.db.get_value("Billing Period Snapshot", {"project": project, "period": period})
+    if not snapshot:
+        frappe.throw(_("{0} is not closed for project {1}").format(period, project))
+    if frappe.db.exists("Archived Billing Summary", {"project": project, "period": period}):
+        frappe.throw(_("{0} of project {1} is archived and cannot be reopened").format(period, project))
+
+    frappe.delete_doc("Billing Period Snapshot", snapshot, ignore_permissions=True)
+    set_entries_closed([project], from_date, to_date, 0)
+    invalidate_project_billing([project])
+
+    return {"message": _("Reopened {0} for project {1}").format(period, project)}
+
+def set_entries_closed(project_names, from_date, to_date, closed):
+    frappe.db.sql("""
+        UPDATE `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        SET tsd.billing_period_closed = %(closed)s
+        WHERE tsd.project IN %(projects)s
+        AND ts.start_date BETWEEN %(from_date)s AND %(to_date)s
+    """, {"closed": closed, "projects": project_names, "from_date": from_date, "to_date": to_date})
+
+def get_period_dates(period):
+    """Normalized YYYY-MM period with its first and last day; 2026-9 becomes 2026-09"""
+    try:
+        from_date = getdate(f"{period}-01")
+    except Exception:
+        frappe.throw(_("Period must be in YYYY-MM format"))
+    return from_date.strftime("%Y-%m"), from_date, get_last_day(from_date)
+
+def get_period_snapshots(project_names, period):
+    """Get the snapshot payload of each project closed for a period"""
+    if not project_names or period >= nowdate()[:7]:
+        return {}
+
+    snapshots = frappe.get_all("Billing Period Snapshot",
+        filters={"project": ["in", project_names], "period": period},
+        fields=["project", "data"]
+    )
+    return {s.project: json.loads(s.data) for s in snapshots}
+
+def validate_billing_period_open(doc, method):
+    """Reject hour edits and approvals of entries in a closed billing period"""
+    if doc.billing_period_closed:
+        frappe.throw(_("Timesheet entry {0} belongs to a closed billing period and cannot be changed").format(doc.name))
+
+def validate_timesheet_periods_open(doc):
+    """Reject submitting or cancelling a timesheet that touches a closed project-month"""
+    if any(row.billing_period_closed for row in doc.time_logs):
+        frappe.throw(_("Timesheet {0} has entries in a closed billing period").format(doc.name))
+
+    projects = {row.project for row in doc.time_logs if row.project}
+    if not projects or not doc.start_date:
+        return
+
+    closed = frappe.get_all("Billing Period Snapshot",
+        filters={"project": ["in", list(projects)], "period": str(getdate(doc.start_date))[:7]},
+        pluck="project"
+    )
+    if closed:
+        frappe.throw(_("The billing period of {0} is closed for project(s) {1}").format(
+            str(getdate(doc.start_date))[:7], ", ".join(sorted(closed))))
@@ -0,0 +1,164 @@
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import flt, cint
+
+DEFAULT_THRESHOLDS = (75, 90, 100)
+
+DIGEST_RECIPIENTS_KEY = "size_billable:budget_alert_recipients"
+DIGEST_QUEUE_PREFIX = "size_billable:budget_alert_digest:"
+
+def parse_thresholds(value):
+    """Parse a comma separated threshold list like "75, 90, 100" into sorted percentages"""
+    if not value:
+        return list(DEFAULT_THRESHOLDS)
+
+    thresholds = set()
+    for part in str(value).split(","):
+        part = part.strip().rstrip("%")
+        if not part:
+            continue
+        try:
+            threshold = float(part)
+        except ValueError:
+            frappe.throw(_("Budget alert threshold {0} is not a number").format(part))
+        if threshold <= 0:
+            frappe.throw(_("Budget alert thresholds must be greater than 0"))
+        thresholds.add(threshold)
+
+    return sorted(thresholds)
+
+def validate_budget_alert_thresholds(doc, method):
+    """Validate and normalize the per-project budget alert thresholds"""
+    thresholds = parse_thresholds(doc.budget_alert_thresholds)
+    doc.budget_alert_thresholds = ", ".join(f"{t:g}" for t in thresholds)
+
+def evaluate_budget_thresholds(project_name, old_consumed, new_consumed, force=False):
+    """Queue an alert for every threshold crossed by a change in consumed hours"""
+    if not force and flt(old_consumed, 2) == flt(new_consumed, 2):
+        return
+
+    # Lock the project row so concurrent changes cannot fire the same threshold twice
+    project = frappe.db.get_value("Project", project_name,
+        ["name", "project_name", "customer", "project_manager_user", "billing_type",
+         "total_purchased_hours", "budget_alert_thresholds", "budget_alert_level", "over_budget"],
+        as_dict=True, for_update=True
+    )
+
+    if not project or project.billing_type != "Hourly Billing" or not flt(project.total_purchased_hours):
+        return
+
+    consumption_percentage = flt(new_consumed) / flt(project.total_purchased_hours) * 100
+    thresholds = parse_thresholds(project.budget_alert_thresholds)
+    reached = max([t for t in thresholds if consumption_percentage >= t], default=0)
+    previous_level = flt(project.budget_alert_level)
+    over_budget = 1 if flt(new_consumed) > flt(project.total_purchased_hours) else 0
+
+    if reached == previous_level and over_budget == cint(project.over_budget):
+        return
+
+    # A drop in consumption (rejections, hour edits) lowers the level so thresholds can fire again
+    frappe.db.set_value("Project", project_name, {
+        "budget_alert_level": reached,
+        "over_budget": over_budget
+    }, update_modified=False)
+
+    crossed = [t for t in thresholds if previous_level < t <= reached]
+    if not crossed:
+        return
+
+    item = {
+        "project": project.name,
+        "project_name": project.project_name,
+        "thresholds": crossed,
+        "consumption_percentage": flt(consumption_percentage, 1),
+        "total_consumed_hours": flt(new_consumed, 2),
+        "total_purchased_hours": flt(project.total_purchased_hours, 2)
+    }
+
+    recipients = []
+    if project.project_manager_user:
+        recipients.append(f"user::{project.project_manager_user}")
+    if project.customer:
+        recipients.append(f"customer::{project.customer}")
+
+    # Only queue once the change is committed, so rolled back approvals never alert
+    frappe.db.after_commit.add(lambda: queue_digest_item(recipients, item))
+
+def queue_digest_item(recipients, item):
+    """Add a threshold crossing to the pending digest of each recipient"""
+    cache = frappe.cache()
+    payload = json.dumps(item)
+    for recipient in recipients:
+        cache.rpush(DIGEST_QUEUE_PREFIX + recipient, payload)
+        cache.sadd(DIGEST_RECIPIENTS_KEY, recipient)
+
+def send_budget_alert_digests():
+    """Hourly task to send one coalesced budget alert email per manager and customer"""
+    cache = frappe.cache()
+    pending = {}
+
+    for recipient in cache.smembers(DIGEST_RECIPIENTS_KEY):
+        recipient = frappe.safe_decode(recipient)
+        cache.srem(DIGEST_RECIPIENTS_KEY, recipient)
+
+        queue_key = DIGEST_QUEUE_PREFIX + recipient
+        items = cache.lrange(queue_key, 0, -1)
+        if not items:
+            continue
+        # Keep anything queued after the read for the next run
+        cache.ltrim(queue_key, len(items), -1)
+        pending[recipient] = [json.loads(item) for item in items]
+
+    if not pending:
+        return
+
+    customers = [key.split("::", 1)[1] for key in pending if key.startswith("customer::")]
+    customer_users = {}
+    if customers:
+        for user in frappe.get_all("User",
+            filters={"customer": ["in", customers], "enabled": 1},
+            fields=["name", "customer"]
+        ):
+            customer_users.setdefault(user.customer, []).append(user.name)
+
+    for recipient, items in pending.items():
+        kind, name = recipient.split("::", 1)
+        users = [name] if kind == "user" else customer_users.get(name, [])
+        if not users:
+            continue
+
+        try:
+            frappe.sendmail(
+                recipients=users,
+                subject=_("Project budget alerts: {0} project(s)").format(len({i["project"] for i in items})),
+                message=get_digest_message(items)
+            )
+        except Exception as e:
+            frappe.logger().error(f"Error sending budget alert digest to {recipient}: {str(e)}")
+
+def get_digest_message(items):
+    """Render the digest email body for a list of threshold crossings"""
+    rows = "".join(
+        "<tr><td>{0}</td><td>{1}</td><td>{2}%</td><td>{3} / {4}</td></tr>".format(
+            frappe.utils.escape_html(item["project_name"] or item["project"]),
+            ", ".join(f"{t:g}%" for t in item["thresholds"]),
+            item["consumption_percentage"],
+            item["total_consumed_hours"],
+            item["total_purchased_hours"]
+        )
+        for item in items
+    )
+
+    return """
+        <p>{0}</p>
+        <table border="1" cellpadding="4" cellspacing="0">
+            <tr><th>{1}</th><th>{2}</th><th>{3}</th><th>{4}</th></tr>
+            {5}
+        </table>
+    """.format(
+        _("The following projects have crossed their budget alert thresholds:"),
+        _("Project"), _("Threshold Crossed"), _("Consumption"), _("Consumed / Purchased Hours"),
+        rows
+    )
@@ -0,0 +1,170 @@
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, nowdate, add_days, date_diff, get_last_day
+
+BURNDOWN_CACHE_KEY = "size_billable:burndown"
+
+# Ranges longer than these are downsampled to the next coarser granularity
+MAX_DAILY_POINTS = 92
+MAX_WEEKLY_POINTS = 104
+
+@frappe.whitelist()
+def get_burndown_series(projects, from_date=None, to_date=None, granularity=None):
+    """Get cumulative approved billable hours against purchased hours for one or many projects"""
+    if isinstance(projects, str) and not projects.startswith("["):
+        projects = [projects]
+    else:
+        projects = frappe.parse_json(projects)
+
+    project_rows = get_accessible_projects(projects)
+    daily_hours = get_daily_hours([p.name for p in project_rows])
+
+    to_date = getdate(to_date or nowdate())
+    result = []
+
+    for project in project_rows:
+        daily = daily_hours.get(project.name, [])
+
+        # Default to the first day with approved hours (or the project start)
+        start = from_date or (daily[0][0] if daily else project.expected_start_date or project.creation)
+        start = min(getdate(start), to_date)
+        series_granularity = granularity or get_auto_granularity(start, to_date)
+
+        purchased = flt(project.total_purchased_hours)
+        points = []
+        for end_date, consumed in build_cumulative_series(daily, start, to_date, series_granularity):
+            points.append({
+                "date": end_date.isoformat(),
+                "consumed_hours": flt(consumed, 2),
+                "remaining_hours": flt(purchased - consumed, 2)
+            })
+
+        result.append({
+            "project": project.name,
+            "project_name": project.project_name,
+            "total_purchased_hours": purchased,
+            "granularity": series_granularity,
+            "points": points
+        })
+
+    return result
+
+def get_accessible_projects(projects):
+    """Return project rows the current user may read as customer, manager or administrator"""
+    user = frappe.session.user
+
+    project_rows = frappe.get_all("Project",
+        filters={"name": ["in", projects]},
+        fields=["name", "project_name", "customer", "project_manager_user",
+                "total_purchased_hours", "expected_start_date", "creation"]
+    )
+
+    if len(project_rows) != len(set(projects)):
+        frappe.throw(_("One or more projects do not exist"))
+
+    if "System Manager" in frappe.get_roles(user):
+        return project_rows
+
+    customer_name = frappe.get_value("User", user, "customer")
+    for project in project_rows:
+        if project.project_manager_user != user and (not customer_name or project.customer != customer_name):
+            frappe.throw(_("You don't have permission to access project {0}").format(project.name))
+
+    return project_rows
+
+def get_daily_hours(project_names):
+    """Get approved billable hours per day for each project, served from cache where possible"""
+    cache = frappe.cache()
+    daily_hours = {}
+    missing = []
+
+    for project_name in project_names:
+        cached = cache.hget(BURNDOWN_CACHE_KEY, project_name)
+        if cached is None:
+            missing.append(project_name)
+        else:
+            daily_hours[project_name] = cached
+
+    if missing:
+        rows = frappe.db.sql("""
+            SELECT
+                tsd.project,
+                ts.start_date,
+                SUM(tsd.billable_hours) as hours
+            FROM `tabTimesheet Detail` tsd
+            INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+            WHERE tsd.project IN %(projects)s
+            AND tsd.approved_by IS NOT NULL
+            AND ts.status = 'Submitted'
+            GROUP BY tsd.project, ts.start_date
+            ORDER BY ts.start_date
+        """, {"projects": missing}, as_dict=True)
+
+        for project_name in missing:
+            daily_hours[project_name] = []
+
+        # Archived history only has monthly totals, which count from the first of their month
+        rows += frappe.db.sql("""
+            SELECT
+                project,
+                period_start as start_date,
+                SUM(approved_billable_hours) as hours
+            FROM `tabArchived Billing Summary`
+            WHERE project IN %(projects)s
+            GROUP BY project, period_start
+        """, {"projects": missing}, as_dict=True)
+        rows.sort(key=lambda row: getdate(row.start_date))
+
+        for row in rows:
+            daily_hours[row.project].append((getdate(row.start_date), flt(row.hours)))
+
+        for project_name in missing:
+            cache.hset(BURNDOWN_CACHE_KEY, project_name, daily_hours[project_name])
+
+    return daily_hours
+
+def get_auto_granularity(from_date, to_date):
+    """Pick the finest granularity that keeps the series to a chartable number of points"""
+    days = date_diff(to_date, from_date) + 1
+    if days <= MAX_DAILY_POINTS:
+        return "daily"
+    if days / 7 <= MAX_WEEKLY_POINTS:
+        return "weekly"
+    return "monthly"
+
+def build_cumulative_series(daily, from_date, to_date, granularity):
+    """Yield (bucket end date, cumulative hours) pairs using a running sum over sorted daily hours"""
+    cumulative = 0
+    index = 0
+
+    for end_date in get_bucket_ends(from_date, to_date, granularity):
+        # Hours before from_date are folded into the first bucket as the opening balance
+        while index < len(daily) and daily[index][0] <= end_date:
+            cumulative += daily[index][1]
+            index += 1
+        yield end_date, cumulative
+
+def get_bucket_ends(from_date, to_date, granularity):
+    """Yield the closing date of every daily, weekly (Monday-Sunday) or monthly bucket in the range"""
+    if granularity not in ("daily", "weekly", "monthly"):
+        frappe.throw(_("Granularity must be daily, weekly or monthly"))
+
+    current = getdate(from_date)
+    while current <= to_date:
+        if granularity == "daily":
+            end_date = current
+        elif granularity == "weekly":
+            end_date = getdate(add_days(current, 6 - current.weekday()))
+        else:
+            end_date = getdate(get_last_day(current))
+
+        end_date = min(end_date, to_date)
+        yield end_date
+        current = getdate(add_days(end_date, 1))
+
+def clear_burndown_cache(project_names):
+    """Drop cached daily hours so the next burn-down request recomputes them"""
+    cache = frappe.cache()
+    for project_name in set(project_names):
+        if project_name:
+            cache.hdel(BURNDOWN_CACHE_KEY, project_name)
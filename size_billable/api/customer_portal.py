@@ -1,14 +1,32 @@
 import frappe
 from frappe import _
-from frappe.utils import flt, getdate, add_months, format_datetime
+from frappe.utils import flt, cint, getdate, get_datetime, nowdate, add_months, format_datetime
 from datetime import datetime, timedelta
 import calendar
+from size_billable.api.versioning import get_customer_version_token, conditional_response
+from size_billable.api.billing_period import get_period_snapshots
+from size_billable.api.replica import replica_read, primary_read
+from size_billable.api.rate_cards import get_billable_amounts
+from size_billable.api.permissions import get_project_access_conditions
+
+PORTAL_BOOTSTRAP_CACHE_KEY = "size_billable:portal_bootstrap"
+
+def get_access_conditions(project_field, user):
+    """The user's project access rules as an AND clause for portal queries"""
+    conditions = get_project_access_conditions(project_field, user)
+    return f"AND {conditions}" if conditions else ""
 
 @frappe.whitelist()
-def get_customer_projects(customer_name=None):
+@replica_read("customer_portal")
+def get_customer_projects(customer_name=None, version=None):
     """Get projects for the current customer user"""
     user = frappe.session.user
     
+    # Answer "not modified" when the client's version token is still current
+    if version is not None:
+        token = get_customer_version_token("get_customer_projects", customer_name=customer_name)
+        return conditional_response(version, token, lambda: get_customer_projects(customer_name))
+    
     # Validate customer role
     if not frappe.has_permission("Customer", "read", user):
         frappe.throw(_("You don't have permission to access customer data"))
@@ -19,42 +37,53 @@ def get_customer_projects(customer_name=None):
         if not customer_name:
             frappe.throw(_("No customer associated with this user"))
     
-    # Get projects for this customer
-    projects = frappe.get_all("Project", 
-        filters={"customer": customer_name, "status": ["!=", "Cancelled"]},
-        fields=["name", "project_name", "billing_type", "total_purchased_hours", 
-                "total_consumed_hours", "hourly_rate", "status", "project_manager_user"]
-    )
+    # Get projects for this customer; access rules are applied in the query
+    projects = frappe.db.sql(f"""
+        SELECT name, project_name, billing_type, total_purchased_hours,
+            total_consumed_hours, hourly_rate, status, project_manager_user
+        FROM `tabProject`
+        WHERE customer = %s
+        AND status != 'Cancelled'
+        {get_access_conditions("name", user)}
+    """, customer_name, as_dict=True)
     
     return projects
 
 @frappe.whitelist()
-def get_project_summary(project_name):
+@replica_read("customer_portal")
+def get_project_summary(project_name, version=None):
     """Get summary cards data for a project"""
     user = frappe.session.user
     
-    # Validate access to project
-    project = frappe.get_doc("Project", project_name)
+    if version is not None:
+        token = get_customer_version_token("get_project_summary", project_name)
+        return conditional_response(version, token, lambda: get_project_summary(project_name))
+    
+    # Validate access to project in the same query that reads it; only the project's customer may read it
     customer_name = frappe.get_value("User", user, "customer")
+    if not customer_name:
+        frappe.throw(_("No customer associated with this user"))
+    
+    project = frappe.db.sql(f"""
+        SELECT project_name, billing_type, total_purchased_hours, total_consumed_hours, hourly_rate
+        FROM `tabProject`
+        WHERE name = %s
+        AND customer = %s
+        {get_access_conditions("name", user)}
+    """, (project_name, customer_name), as_dict=True)
     
-    if project.customer != customer_name:
+    if not project:
         frappe.throw(_("You don't have permission to access this project"))
+    project = project[0]
     
     # Calculate summary data
     remaining_hours = (project.total_purchased_hours or 0) - (project.total_consumed_hours or 0)
     consumption_percentage = 0
-    if project.total_purchased_hours > 0:
-        consumption_percentage = (project.total_consumed_hours / project.total_purchased_hours) * 100
+    if flt(project.total_purchased_hours) > 0:
+        consumption_percentage = (flt(project.total_consumed_hours) / project.total_purchased_hours) * 100
     
     # Get approved billable hours (only approved entries are visible to customers)
-    approved_billable_hours = frappe.db.sql("""
-        SELECT SUM(tsd.billable_hours)
-        FROM `tabTimesheet Detail` tsd
-        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
-        WHERE tsd.project = %s
-        AND tsd.approved_by IS NOT NULL
-        AND ts.status = 'Submitted'
-    """, project_name)[0][0] or 0
+    approved_billable_hours = get_approved_billable_hours([project_name])
     
     return {
         "project_name": project.project_name,
@@ -65,14 +94,23 @@ def get_project_summary(project_name):
         "remaining_hours": remaining_hours,
         "consumption_percentage": consumption_percentage,
         "hourly_rate": project.hourly_rate,
-        "total_billable_amount": approved_billable_hours * (project.hourly_rate or 0)
+        "total_billable_amount": get_billable_amounts([project_name]).get(project_name, 0)
     }
 
 @frappe.whitelist()
-def get_billing_data(project_name=None, month=None, year=None):
-    """Get detailed billing data for customer portal with month-based filtering"""
+@replica_read("customer_portal")
+def get_billing_data(project_name=None, month=None, year=None, compact=0, version=None):
+    """Get detailed billing data for customer portal with month-based filtering
+    
+    With compact=1 the entries are returned in a columnar, dictionary-encoded format
+    (see build_columnar_billing_data) and formatting is left to the client.
+    """
     user = frappe.session.user
     
+    if version is not None:
+        token = get_customer_version_token("get_billing_data", project_name, month, year, compact, nowdate()[:7])
+        return conditional_response(version, token, lambda: get_billing_data(project_name, month, year, compact))
+    
     # Validate customer access
     customer_name = frappe.get_value("User", user, "customer")
     if not customer_name:
@@ -83,14 +121,21 @@ def get_billing_data(project_name=None, month=None, year=None):
         now = datetime.now()
         month = now.month
         year = now.year
+    month = cint(month)
+    year = cint(year)
     
     # Get projects for this customer
     if project_name:
-        # Validate project belongs to customer
-        project_customer = frappe.get_value("Project", project_name, "customer")
-        if project_customer != customer_name:
+        # Validate project belongs to customer and is visible to the user
+        if not frappe.db.sql(f"""
+            SELECT name
+            FROM `tabProject`
+            WHERE name = %s
+            AND customer = %s
+            {get_access_conditions("name", user)}
+        """, (project_name, customer_name)):
             frappe.throw(_("You don't have permission to access this project"))
-        project_filter = project_name
+        project_filter = [project_name]
     else:
         # Get all customer projects
         projects = frappe.get_all("Project", 
@@ -99,7 +144,7 @@ def get_billing_data(project_name=None, month=None, year=None):
         )
         if not projects:
             return {}
-        project_filter = ["in", projects]
+        project_filter = projects
     
     # Calculate date range for the month
     start_date = datetime(year, month, 1)
@@ -108,38 +153,24 @@ def get_billing_data(project_name=None, month=None, year=None):
     else:
         end_date = datetime(year, month + 1, 1) - timedelta(days=1)
     
-    # Get approved timesheet data (only approved entries are visible to customers)
-    billing_data = frappe.db.sql("""
-        SELECT 
-            tsd.name,
-            tsd.project,
-            tsd.task,
-            tsd.activity_type,
-            tsd.description,
-            tsd.billable_hours,
-            tsd.approved_by,
-            tsd.approved_on,
-            ts.employee,
-            ts.employee_name,
-            ts.start_date,
-            p.project_name,
-            p.billing_type,
-            p.hourly_rate
-        FROM `tabTimesheet Detail` tsd
-        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
-        INNER JOIN `tabProject` p ON tsd.project = p.name
-        WHERE tsd.project = %s
-        AND ts.status = 'Submitted'
-        AND tsd.approved_by IS NOT NULL
-        AND ts.start_date >= %s
-        AND ts.start_date <= %s
-        ORDER BY ts.start_date DESC, p.project_name, tsd.task
-    """, (project_filter, start_date, end_date), as_dict=True)
+    year_month = f"{year}-{month:02d}"
+    
+    # Closed months are read from their snapshots; only projects without one are queried live
+    snapshots = get_period_snapshots(project_filter, year_month)
+    live_projects = [p for p in project_filter if p not in snapshots]
+    billing_data = get_approved_entries(live_projects, start_date, end_date) if live_projects else []
+    
+    if snapshots:
+        for payload in snapshots.values():
+            billing_data.extend(decode_columnar_billing_data(payload))
+        sort_billing_entries(billing_data)
     
     # Group data by month and project
     result = {}
     month_name = calendar.month_name[month]
-    year_month = f"{year}-{month:02d}"
+    
+    if cint(compact):
+        return build_columnar_billing_data(billing_data, year_month, f"{month_name} {year}")
     
     result[year_month] = {
         "month": f"{month_name} {year}",
@@ -173,26 +204,140 @@ def get_billing_data(project_name=None, month=None, year=None):
     
     return result
 
+def get_approved_entries(project_names, start_date, end_date):
+    """Get approved entries of projects within a date range (only approved entries are visible to customers)"""
+    return frappe.db.sql("""
+        SELECT 
+            tsd.name,
+            tsd.project,
+            tsd.task,
+            tsd.activity_type,
+            tsd.description,
+            tsd.billable_hours,
+            tsd.billing_amount,
+            tsd.approved_by,
+            tsd.approved_on,
+            ts.employee,
+            ts.employee_name,
+            ts.start_date,
+            p.project_name,
+            p.billing_type,
+            p.hourly_rate
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        INNER JOIN `tabProject` p ON tsd.project = p.name
+        WHERE tsd.project IN %s
+        AND ts.status = 'Submitted'
+        AND tsd.approved_by IS NOT NULL
+        AND ts.start_date >= %s
+        AND ts.start_date <= %s
+        ORDER BY ts.start_date DESC, p.project_name, tsd.task
+    """, (project_names, start_date, end_date), as_dict=True)
+
+def sort_billing_entries(billing_data):
+    """Sort entries like get_approved_entries does (date descending, then project and task)"""
+    billing_data.sort(key=lambda entry: (entry.project_name or "", entry.task or ""))
+    billing_data.sort(key=lambda entry: entry.start_date, reverse=True)
+
+def build_columnar_billing_data(billing_data, year_month, month_label):
+    """Build the compact billing payload: one array per column, repeated strings as dictionary indexes
+    
+    Dates are ISO strings and numbers are raw, the client formats them. A row i is made of
+    columns[c][i] for every column, with dictionary columns resolved via dictionaries[c].
+    """
+    dictionaries = {}
+    columns = {}
+    
+    for field in ("project", "task", "activity_type", "employee_name", "approved_by"):
+        dictionaries[field], columns[field] = dictionary_encode(entry[field] for entry in billing_data)
+    
+    columns["name"] = [entry.name for entry in billing_data]
+    columns["billable_hours"] = [flt(entry.billable_hours) for entry in billing_data]
+    columns["date"] = [entry.start_date.isoformat() for entry in billing_data]
+    columns["approved_on"] = [entry.approved_on.isoformat() if entry.approved_on else None for entry in billing_data]
+    columns["description"] = [entry.description for entry in billing_data]
+    
+    # Project attributes are sent once per project instead of once per entry
+    projects = {}
+    for entry in billing_data:
+        if entry.project not in projects:
+            projects[entry.project] = {
+                "project_name": entry.project_name,
+                "billing_type": entry.billing_type,
+                "hourly_rate": entry.hourly_rate
+            }
+    
+    return {
+        "format": "columnar",
+        "month_key": year_month,
+        "month": month_label,
+        "row_count": len(billing_data),
+        "projects": projects,
+        "dictionaries": dictionaries,
+        "columns": columns
+    }
+
+def decode_columnar_billing_data(payload):
+    """Turn a columnar billing payload back into entry rows, as returned by get_approved_entries"""
+    columns = payload["columns"]
+    dictionaries = payload["dictionaries"]
+    entries = []
+    
+    for i in range(payload["row_count"]):
+        entry = frappe._dict({
+            field: dictionaries[field][columns[field][i]]
+            for field in ("project", "task", "activity_type", "employee_name", "approved_by")
+        })
+        project = payload["projects"][entry.project]
+        entry.update({
+            "name": columns["name"][i],
+            "billable_hours": columns["billable_hours"][i],
+            "start_date": getdate(columns["date"][i]),
+            "approved_on": get_datetime(columns["approved_on"][i]) if columns["approved_on"][i] else None,
+            "description": columns["description"][i],
+            "project_name": project["project_name"],
+            "billing_type": project["billing_type"],
+            "hourly_rate": project["hourly_rate"]
+        })
+        entries.append(entry)
+    
+    return entries
+
+def dictionary_encode(values):
+    """Replace repeated values with indexes into a list of distinct values"""
+    lookup = {}
+    dictionary = []
+    indexes = []
+    
+    for value in values:
+        if value not in lookup:
+            lookup[value] = len(dictionary)
+            dictionary.append(value)
+        indexes.append(lookup[value])
+    
+    return dictionary, indexes
+
 @frappe.whitelist()
-def get_customer_dashboard_data():
+@replica_read("customer_portal")
+def get_customer_dashboard_data(compact=0, version=None):
     """Get complete dashboard data for customer portal"""
     user = frappe.session.user
     
+    if version is not None:
+        token = get_customer_version_token("get_customer_dashboard_data", compact, nowdate()[:7])
+        return conditional_response(version, token, lambda: get_customer_dashboard_data(compact))
+    
     # Get customer projects
     projects = get_customer_projects()
     
     # Get current month data
     now = datetime.now()
-    current_month_data = get_billing_data(month=now.month, year=now.year)
+    current_month_data = get_billing_data(month=now.month, year=now.year, compact=compact)
     
     # Calculate totals across all projects
-    total_purchased = sum(p.get("total_purchased_hours", 0) for p in projects)
-    total_consumed = sum(p.get("total_consumed_hours", 0) for p in projects)
-    total_approved = 0
-    
-    for project in projects:
-        summary = get_project_summary(project.name)
-        total_approved += summary.get("approved_billable_hours", 0)
+    total_purchased = sum(flt(p.get("total_purchased_hours")) for p in projects)
+    total_consumed = sum(flt(p.get("total_consumed_hours")) for p in projects)
+    total_approved = get_approved_billable_hours([p.name for p in projects])
     
     return {
         "projects": projects,
@@ -205,28 +350,92 @@ def get_customer_dashboard_data():
         }
     }
 
+def get_approved_billable_hours(project_names):
+    """Get approved billable hours across many projects, live and archived, in one query"""
+    if not project_names:
+        return 0
+    
+    return flt(frappe.db.sql("""
+        SELECT
+            IFNULL((
+                SELECT SUM(tsd.billable_hours)
+                FROM `tabTimesheet Detail` tsd
+                INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+                WHERE tsd.project IN %(projects)s
+                AND tsd.approved_by IS NOT NULL
+                AND ts.status = 'Submitted'
+            ), 0) + IFNULL((
+                SELECT SUM(arc.approved_billable_hours)
+                FROM `tabArchived Billing Summary` arc
+                WHERE arc.project IN %(projects)s
+            ), 0)
+    """, {"projects": project_names})[0][0])
+
+@primary_read
+def get_portal_bootstrap():
+    """Get the initial portal state (dashboard, projects, months) for the current customer
+    
+    The result is cached per customer and reused as long as the customer's version token
+    is unchanged, so repeat visits cost a token check only. Being cached under the current
+    token, it is always built from the primary.
+    """
+    customer_name = frappe.get_value("User", frappe.session.user, "customer")
+    token = get_customer_version_token("portal_bootstrap", nowdate()[:7])
+    
+    cached = frappe.cache().hget(PORTAL_BOOTSTRAP_CACHE_KEY, customer_name)
+    if cached and cached.get("token") == token:
+        return cached["data"]
+    
+    dashboard = get_customer_dashboard_data(compact=1)
+    data = {
+        "customer_name": customer_name,
+        "dashboard": dashboard,
+        "available_months": get_available_months(),
+        # Tokens matching what the endpoints compute, so the portal's first refresh can be "not modified"
+        "versions": {
+            "get_customer_dashboard_data": get_customer_version_token("get_customer_dashboard_data", 1, nowdate()[:7]),
+            "get_available_months": get_customer_version_token("get_available_months")
+        }
+    }
+    
+    frappe.cache().hset(PORTAL_BOOTSTRAP_CACHE_KEY, customer_name, {"token": token, "data": data})
+    return data
+
 @frappe.whitelist()
-def get_available_months():
+@replica_read("customer_portal")
+def get_available_months(version=None):
     """Get list of available months with approved data for customer"""
     user = frappe.session.user
+    
+    if version is not None:
+        token = get_customer_version_token("get_available_months")
+        return conditional_response(version, token, get_available_months)
     customer_name = frappe.get_value("User", user, "customer")
     
     if not customer_name:
         return []
     
-    # Get months with approved timesheet data
+    # Get months with approved timesheet data, including archived months
     months = frappe.db.sql("""
-        SELECT DISTINCT 
+        SELECT 
             YEAR(ts.start_date) as year,
             MONTH(ts.start_date) as month
         FROM `tabTimesheet Detail` tsd
         INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
         INNER JOIN `tabProject` p ON tsd.project = p.name
-        WHERE p.customer = %s
+        WHERE p.customer = %(customer)s
         AND ts.status = 'Submitted'
         AND tsd.approved_by IS NOT NULL
+        UNION
+        SELECT 
+            YEAR(arc.period_start) as year,
+            MONTH(arc.period_start) as month
+        FROM `tabArchived Billing Summary` arc
+        INNER JOIN `tabProject` p ON arc.project = p.name
+        WHERE p.customer = %(customer)s
+        AND arc.approved_count > 0
         ORDER BY year DESC, month DESC
-    """, customer_name, as_dict=True)
+    """, {"customer": customer_name}, as_dict=True)
     
     result = []
     for month_data in months:
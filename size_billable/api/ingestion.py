@@ -0,0 +1,123 @@
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, getdate, get_datetime
+from frappe.utils.csvutils import read_csv_content
+from size_billable.api.timesheet import validate_time_log_hours, update_project_consumed_hours
+
+# Timesheets committed per transaction
+INGESTION_CHUNK_SIZE = 200
+
+TIME_LOG_FIELDS = ("employee", "activity_type", "project", "task", "from_time", "to_time",
+    "hours", "billable_hours", "description")
+
+@frappe.whitelist()
+def ingest_time_logs(time_logs=None, csv_content=None, submit=1):
+    """Create timesheets in bulk from external time logs
+
+    Accepts a JSON list of time logs or CSV content with a header row using the
+    TIME_LOG_FIELDS column names. Logs are grouped into one timesheet per employee
+    and day, and each affected project is recomputed once at the end.
+    """
+    started = time.monotonic()
+    rows = parse_time_logs(time_logs, csv_content)
+
+    errors = []
+    timesheets = {}
+    for index, row in enumerate(rows):
+        error = validate_time_log(row)
+        if error:
+            errors.append({"row": index, "error": error})
+            continue
+
+        key = (row.employee, getdate(row.from_time))
+        timesheets.setdefault(key, []).append((index, row))
+
+    created = []
+    ingested_rows = 0
+    groups = list(timesheets.values())
+
+    # Projects are collected by lock_timesheet_entries instead of being recomputed per timesheet
+    deferred_projects = frappe.flags.size_billable_deferred_projects = set()
+    try:
+        for start in range(0, len(groups), INGESTION_CHUNK_SIZE):
+            for group in groups[start:start + INGESTION_CHUNK_SIZE]:
+                frappe.db.savepoint("size_billable_ingest_timesheet")
+                try:
+                    created.append(create_timesheet([row for _index, row in group], cint(submit)))
+                    ingested_rows += len(group)
+                except Exception as e:
+                    frappe.db.rollback(save_point="size_billable_ingest_timesheet")
+                    errors.extend({"row": index, "error": str(e)} for index, _row in group)
+
+            frappe.db.commit()
+    finally:
+        frappe.flags.size_billable_deferred_projects = None
+
+    # Recompute each affected project exactly once
+    for project_name in sorted(deferred_projects):
+        update_project_consumed_hours(project_name)
+        frappe.db.commit()
+
+    seconds = time.monotonic() - started
+    errors.sort(key=lambda error: error["row"])
+
+    return {
+        "message": _("Ingested {0} time logs into {1} timesheets").format(ingested_rows, len(created)),
+        "timesheets_created": len(created),
+        "rows_ingested": ingested_rows,
+        "rows_failed": len(errors),
+        "projects_recomputed": len(deferred_projects),
+        "seconds": flt(seconds, 3),
+        "rows_per_second": flt(ingested_rows / seconds, 1) if seconds else ingested_rows,
+        "errors": errors
+    }
+
+def parse_time_logs(time_logs, csv_content):
+    """Turn a JSON list or CSV content (header row + data rows) into time log dicts"""
+    if csv_content:
+        csv_rows = read_csv_content(csv_content)
+        if not csv_rows:
+            return []
+        header = [column.strip() for column in csv_rows[0]]
+        time_logs = []
+        for i, row in enumerate(csv_rows[1:], start=2):
+            if not any(row):
+                continue
+            if len(row) != len(header):
+                frappe.throw(_("Row {0} has {1} columns, the header has {2}").format(i, len(row), len(header)))
+            time_logs.append(frappe._dict(zip(header, row, strict=True)))
+        return time_logs
+
+    return [frappe._dict(row) for row in frappe.parse_json(time_logs or "[]")]
+
+def validate_time_log(row):
+    """Validate one time log with the same hour rules as calculate_billable_hours; return an error or None"""
+    for field in ("employee", "activity_type", "from_time", "hours"):
+        if not row.get(field):
+            return _("{0} is required").format(field)
+
+    try:
+        get_datetime(row.from_time)
+        row.hours = flt(row.hours)
+        row.billable_hours = flt(row.billable_hours)
+        validate_time_log_hours(row)
+    except Exception as e:
+        return str(e)
+
+def create_timesheet(rows, submit):
+    """Insert (and optionally submit) one timesheet for a single employee and day"""
+    projects = {row.project for row in rows if row.project}
+    timesheet = frappe.get_doc({
+        "doctype": "Timesheet",
+        "employee": rows[0].employee,
+        "parent_project": projects.pop() if len(projects) == 1 else None,
+        "time_logs": [{field: row.get(field) for field in TIME_LOG_FIELDS if field != "employee"} for row in rows]
+    })
+    timesheet.insert()
+
+    if submit:
+        timesheet.submit()
+
+    return timesheet.name
@@ -0,0 +1,230 @@
+import frappe
+from frappe import _
+from frappe.utils import flt, cint, getdate, nowdate, now_datetime
+
+# Customers invoiced per transaction
+INVOICING_CHUNK_SIZE = 50
+
+INVOICING_ROLES = ("System Manager", "Accounts Manager")
+RUN_CACHE_PREFIX = "size_billable:invoicing_run:"
+RUN_EXPIRY = 7 * 24 * 60 * 60
+PROGRESS_EVENT = "size_billable_invoicing_progress"
+
+# Approved, billable, not yet invoiced entries of hourly projects; shared by the customer scan and chunk queries
+ELIGIBLE_ENTRY_CONDITIONS = """
+    tsd.approval_status = 'Approved'
+    AND ts.status = 'Submitted'
+    AND tsd.billable_hours > 0
+    AND IFNULL(tsd.sales_invoice, '') = ''
+    AND p.billing_type = 'Hourly Billing'
+    AND IFNULL(p.customer, '') != ''
+    AND ts.start_date BETWEEN %(from_date)s AND %(to_date)s
+"""
+
+@frappe.whitelist()
+def start_invoicing_run(from_date, to_date, item_code, company=None, submit=0):
+    """Queue an invoicing run creating one Sales Invoice per customer for approved, uninvoiced hours
+
+    Invoiced entries are linked to their invoice through Timesheet Detail.sales_invoice,
+    so running the same period again only picks up entries approved since.
+    """
+    frappe.only_for(INVOICING_ROLES)
+
+    if getdate(from_date) > getdate(to_date):
+        frappe.throw(_("From Date cannot be after To Date"))
+    if not frappe.db.exists("Item", item_code):
+        frappe.throw(_("Item {0} does not exist").format(item_code))
+
+    company = company or frappe.defaults.get_user_default("Company")
+    if not company:
+        frappe.throw(_("Please set a Company for the invoicing run"))
+
+    run_id = frappe.generate_hash(length=12)
+    run = {
+        "run_id": run_id,
+        "user": frappe.session.user,
+        "from_date": str(getdate(from_date)),
+        "to_date": str(getdate(to_date)),
+        "item_code": item_code,
+        "company": company,
+        "submit": cint(submit),
+        "total": 0,
+        "processed": 0,
+        "invoices": [],
+        "errors": {},
+        "status": "Queued",
+        "error": None,
+        "created_on": str(now_datetime())
+    }
+    save_run(run)
+
+    frappe.enqueue(
+        "size_billable.api.invoicing.run_invoicing",
+        queue="long",
+        timeout=4 * 60 * 60,
+        enqueue_after_commit=True,
+        invoicing_run=run_id
+    )
+
+    return {"queued": True, "run_id": run_id}
+
+def run_invoicing(invoicing_run):
+    """Invoice eligible customers in chunks, committing and publishing progress after each chunk"""
+    run = get_run(invoicing_run)
+    if not run or run["status"] == "Completed":
+        return
+
+    run["status"] = "Running"
+    save_run(run)
+
+    params = {"from_date": run["from_date"], "to_date": run["to_date"]}
+
+    try:
+        customers = frappe.db.sql_list(f"""
+            SELECT DISTINCT p.customer
+            FROM `tabTimesheet Detail` tsd
+            INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+            INNER JOIN `tabProject` p ON tsd.project = p.name
+            WHERE {ELIGIBLE_ENTRY_CONDITIONS}
+            ORDER BY p.customer
+        """, params)
+
+        run["total"] = len(customers)
+        run["processed"] = 0
+        save_run(run)
+        publish_progress(run)
+
+        for start in range(0, len(customers), INVOICING_CHUNK_SIZE):
+            invoice_customer_chunk(run, customers[start:start + INVOICING_CHUNK_SIZE], params)
+            frappe.db.commit()
+
+            run["processed"] += len(customers[start:start + INVOICING_CHUNK_SIZE])
+            save_run(run)
+            publish_progress(run)
+
+        run["status"] = "Completed"
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Error in invoicing run {invoicing_run}: {str(e)}")
+        run["status"] = "Failed"
+        run["error"] = str(e)
+
+    save_run(run)
+    publish_progress(run)
+
+def invoice_customer_chunk(run, customers, params):
+    """Create one invoice per customer from a single locked query over the chunk's entries"""
+    # FOR UPDATE keeps a concurrent run from invoicing the same entries twice
+    entries = frappe.db.sql(f"""
+        SELECT
+            tsd.name,
+            tsd.project,
+            tsd.billable_hours,
+            tsd.billing_rate,
+            p.customer,
+            p.project_name
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        INNER JOIN `tabProject` p ON tsd.project = p.name
+        WHERE {ELIGIBLE_ENTRY_CONDITIONS}
+        AND p.customer IN %(customers)s
+        ORDER BY p.customer, tsd.project
+        FOR UPDATE
+    """, dict(params, customers=customers), as_dict=True)
+
+    by_customer = {}
+    for entry in entries:
+        # Entries billed at different rate cards become separate lines of the project
+        projects = by_customer.setdefault(entry.customer, {})
+        project = projects.setdefault((entry.project, flt(entry.billing_rate)), {
+            "project": entry.project,
+            "project_name": entry.project_name,
+            "billing_rate": flt(entry.billing_rate),
+            "hours": 0,
+            "entries": []
+        })
+        project["hours"] += flt(entry.billable_hours)
+        project["entries"].append(entry.name)
+
+    for customer, projects in by_customer.items():
+        frappe.db.savepoint("size_billable_invoice_customer")
+        try:
+            invoice_name = create_customer_invoice(run, customer, projects)
+            entry_names = [name for project in projects.values() for name in project["entries"]]
+
+            frappe.db.sql("""
+                UPDATE `tabTimesheet Detail`
+                SET sales_invoice = %s
+                WHERE name IN %s
+            """, (invoice_name, entry_names))
+
+            run["invoices"].append(invoice_name)
+        except Exception as e:
+            frappe.db.rollback(save_point="size_billable_invoice_customer")
+            run["errors"][customer] = str(e)
+
+def create_customer_invoice(run, customer, projects):
+    """Build a Sales Invoice with one line per project and billing rate"""
+    period = f"{run['from_date']} - {run['to_date']}"
+
+    invoice = frappe.get_doc({
+        "doctype": "Sales Invoice",
+        "customer": customer,
+        "company": run["company"],
+        "posting_date": nowdate(),
+        "items": [
+            {
+                "item_code": run["item_code"],
+                "description": _("Approved billable hours for {0} ({1})").format(
+                    project["project_name"] or project["project"], period),
+                "qty": flt(project["hours"], 2),
+                "rate": project["billing_rate"],
+                "project": project["project"]
+            }
+            for key, project in sorted(projects.items())
+        ]
+    })
+    invoice.set_missing_values()
+    invoice.insert()
+
+    if run["submit"]:
+        invoice.submit()
+
+    return invoice.name
+
+def publish_progress(run):
+    """Push run progress to the user who started it"""
+    frappe.publish_realtime(PROGRESS_EVENT, {
+        "run_id": run["run_id"],
+        "status": run["status"],
+        "processed": run["processed"],
+        "total": run["total"],
+        "invoices": len(run["invoices"]),
+        "errors": len(run["errors"]),
+        "error": run["error"]
+    }, user=run["user"])
+
+def get_run(run_id):
+    return frappe.cache().get_value(RUN_CACHE_PREFIX + run_id)
+
+def save_run(run):
+    frappe.cache().set_value(RUN_CACHE_PREFIX + run["run_id"], run, expires_in_sec=RUN_EXPIRY)
+
+@frappe.whitelist()
+def get_invoicing_run(run_id):
+    """Get the status, created invoices and per-customer errors of an invoicing run"""
+    frappe.only_for(INVOICING_ROLES)
+
+    run = get_run(run_id)
+    if not run:
+        frappe.throw(_("Invoicing run {0} not found or expired").format(run_id))
+    return run
+
+def release_invoiced_entries(doc, method):
+    """Make entries of a cancelled or deleted invoice eligible for the next invoicing run"""
+    frappe.db.sql("""
+        UPDATE `tabTimesheet Detail`
+        SET sales_invoice = NULL
+        WHERE sales_invoice = %s
+    """, doc.name)
@@ -0,0 +1,134 @@
+import frappe
+from frappe.utils.caching import request_cache
+from size_billable.api.approvers import get_approvable_projects, get_approvable_projects_query
+
+# Roles that keep ERPNext's standard access to projects and timesheets
+UNRESTRICTED_ROLES = ("System Manager", "Accounts Manager", "Projects Manager")
+
+@request_cache
+def get_user_customer(user):
+    return frappe.get_value("User", user, "customer")
+
+@request_cache
+def get_access(user):
+    """How a user's access is restricted: (is_project_manager, customer); None when unrestricted
+
+    Only project managers and customer users are restricted by this app; everyone else
+    keeps the standard role permissions.
+    """
+    if user == "Administrator":
+        return None
+
+    roles = frappe.get_roles(user)
+    if any(role in roles for role in UNRESTRICTED_ROLES):
+        return None
+
+    is_project_manager = "Project Manager" in roles
+    customer = get_user_customer(user)
+    if not is_project_manager and not customer:
+        return None
+    return is_project_manager, customer
+
+def get_project_access_conditions(project_field, user=None, approved_field=None):
+    """SQL conditions on a project column for the projects a user may see
+
+    Managers and approvers see their projects; customers see their customer's projects, and
+    only approved entries of them when approved_field is given. Returns "" when unrestricted.
+    """
+    user = user or frappe.session.user
+    access = get_access(user)
+    if access is None:
+        return ""
+
+    is_project_manager, customer = access
+    conditions = []
+    if is_project_manager:
+        conditions.append(f"{project_field} IN ({get_approvable_projects_query(user)})")
+    if customer:
+        condition = f"""{project_field} IN (
+            SELECT name FROM `tabProject` WHERE customer = {frappe.db.escape(customer)})"""
+        if approved_field:
+            condition = f"({condition} AND {approved_field} = 'Approved')"
+        conditions.append(condition)
+
+    return "(" + " OR ".join(conditions) + ")"
+
+def get_project_conditions(user=None):
+    """permission_query_conditions for Project"""
+    user = user or frappe.session.user
+    conditions = get_project_access_conditions("`tabProject`.name", user)
+    if not conditions:
+        return ""
+
+    # Team members keep seeing the projects they log time on
+    return f"""({conditions} OR `tabProject`.name IN (
+        SELECT parent FROM `tabProject User` WHERE user = {frappe.db.escape(user)}))"""
+
+def get_timesheet_conditions(user=None):
+    """permission_query_conditions for Timesheet: own timesheets and those with visible entries"""
+    user = user or frappe.session.user
+    conditions = get_project_access_conditions("tsd.project", user, approved_field="tsd.approval_status")
+    if not conditions:
+        return ""
+
+    return f"""(`tabTimesheet`.owner = {frappe.db.escape(user)} OR EXISTS (
+        SELECT 1 FROM `tabTimesheet Detail` tsd
+        WHERE tsd.parent = `tabTimesheet`.name
+        AND tsd.parenttype = 'Timesheet'
+        AND {conditions}))"""
+
+def get_timesheet_detail_conditions(user=None):
+    """permission_query_conditions for Timesheet Detail"""
+    user = user or frappe.session.user
+    conditions = get_project_access_conditions("`tabTimesheet Detail`.project", user,
+        approved_field="`tabTimesheet Detail`.approval_status")
+    if not conditions:
+        return ""
+
+    return f"""({conditions} OR `tabTimesheet Detail`.parent IN (
+        SELECT name FROM `tabTimesheet` WHERE owner = {frappe.db.escape(user)}))"""
+
+def can_access_project(project_name, user, approved=True):
+    """Document-level counterpart of get_project_access_conditions"""
+    is_project_manager, customer = get_access(user)
+    if is_project_manager and project_name in get_approvable_projects(user):
+        return True
+    if customer and approved:
+        return frappe.db.get_value("Project", project_name, "customer", cache=True) == customer
+    return False
+
+def has_project_permission(doc, ptype=None, user=None):
+    user = user or frappe.session.user
+    access = get_access(user)
+    if access is None:
+        return True
+
+    # New projects have no name yet; validate_project_manager decides who may manage them
+    if ptype == "create" or doc.is_new():
+        return True
+
+    if doc.name in get_approvable_projects(user) or user in [row.user for row in doc.get("users") or []]:
+        return True
+    # Customers only read their projects
+    return bool(access[1]) and ptype in (None, "read", "print") and doc.customer == access[1]
+
+def has_timesheet_permission(doc, ptype=None, user=None):
+    user = user or frappe.session.user
+    if get_access(user) is None or doc.owner == user:
+        return True
+
+    read_only = ptype in (None, "read", "print")
+    return any(
+        row.project and can_access_project(row.project, user, read_only and row.approval_status == "Approved")
+        for row in doc.get("time_logs") or []
+    )
+
+def has_timesheet_detail_permission(doc, ptype=None, user=None):
+    user = user or frappe.session.user
+    if get_access(user) is None:
+        return True
+
+    read_only = ptype in (None, "read", "print")
+    if doc.project and can_access_project(doc.project, user, read_only and doc.approval_status == "Approved"):
+        return True
+    return frappe.db.get_value("Timesheet", doc.parent, "owner") == user
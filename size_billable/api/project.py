@@ -1,16 +1,33 @@
 import frappe
 from frappe import _
 from frappe.utils import flt, now_datetime
+from frappe.utils.caching import request_cache
+from size_billable.api.versioning import invalidate_project_billing, get_project_versions
+from size_billable.api.realtime import record_entry_change, record_project_change
+from size_billable.api.budget_alerts import evaluate_budget_thresholds
+from size_billable.api.approval_jobs import BACKGROUND_JOB_THRESHOLD, enqueue_background_job
+from size_billable.api.rate_cards import get_billable_amounts
+from size_billable.api.approval_latency import record_approval_latency
+from size_billable.api.approvers import can_approve, validate_can_approve
+
+BILLING_SUMMARY_CACHE_KEY = "size_billable:project_billing_summary"
 
 def validate_project_manager(doc, method):
     """Validate that project has exactly one manager with proper role"""
     if not doc.project_manager_user:
         frappe.throw(_("Project Manager is required"))
     
-    # Check if user has Project Manager role
-    user_roles = frappe.get_roles(doc.project_manager_user)
-    if "Project Manager" not in user_roles:
-        frappe.throw(_("Selected user must have Project Manager role"))
+    # Check if user has Project Manager role (only when the manager is set or changed)
+    if doc.is_new() or doc.has_value_changed("project_manager_user"):
+        if not has_project_manager_role(doc.project_manager_user):
+            frappe.throw(_("Selected user must have Project Manager role"))
+    
+    # Derived billing fields are written directly in the database; never save a stale form copy
+    if not doc.is_new():
+        derived = frappe.db.get_value("Project", doc.name,
+            ["total_consumed_hours", "budget_alert_level", "over_budget"], as_dict=True)
+        if derived:
+            doc.update(derived)
     
     # Validate billing type specific requirements
     if doc.billing_type == "Hourly Billing":
@@ -26,30 +43,128 @@ def validate_project_manager(doc, method):
         doc.total_consumed_hours = 0
         doc.hourly_rate = 0
 
+@request_cache
+def has_project_manager_role(user):
+    """Check the Project Manager role once per user per request"""
+    return "Project Manager" in frappe.get_roles(user)
+
 def update_project_hours(doc, method):
-    """Update total consumed hours when timesheet entries are approved"""
-    if doc.billing_type == "Hourly Billing":
-        # Recalculate total consumed hours from approved timesheet entries
-        total_consumed = frappe.db.sql("""
-            SELECT SUM(tsd.billable_hours)
+    """Re-evaluate budget alerts when purchased hours or thresholds are edited"""
+    invalidate_project_billing([doc.name])
+    
+    if doc.billing_type != "Hourly Billing":
+        return
+    
+    # Consumed hours are maintained by the derived-field write path, not on save
+    previous = doc.get_doc_before_save()
+    if previous and (
+        flt(previous.total_purchased_hours) != flt(doc.total_purchased_hours)
+        or previous.budget_alert_thresholds != doc.budget_alert_thresholds
+    ):
+        evaluate_budget_thresholds(doc.name, doc.total_consumed_hours, doc.total_consumed_hours, force=True)
+
+def apply_consumed_hours_deltas(deltas):
+    """Apply per-project consumed-hours deltas, locking projects in a consistent order
+    
+    Every project in deltas was touched, so its billing version is bumped even when the delta is 0.
+    """
+    for project_name in sorted(deltas):
+        apply_consumed_hours_delta(project_name, deltas[project_name])
+    
+    invalidate_project_billing(deltas)
+
+def apply_consumed_hours_delta(project_name, delta):
+    """Atomically add a change in approved billable hours to a project's consumed hours"""
+    if not project_name or not flt(delta, 9):
+        return
+    
+    # In-database increment: concurrent approvals queue on the row lock instead of overwriting each other
+    frappe.db.sql("""
+        UPDATE `tabProject`
+        SET total_consumed_hours = IFNULL(total_consumed_hours, 0) + %s
+        WHERE name = %s
+        AND billing_type = 'Hourly Billing'
+    """, (flt(delta), project_name))
+    
+    # The row is locked by this transaction now, so this reads back our own result
+    new_consumed = flt(frappe.db.get_value("Project", project_name, "total_consumed_hours"))
+    after_consumed_hours_change(project_name, new_consumed - flt(delta), new_consumed)
+
+def recompute_project_consumed_hours(project_name):
+    """Recalculate consumed hours from all approved entries (live and archived) in a single UPDATE statement"""
+    old_consumed = flt(frappe.db.get_value("Project", project_name, "total_consumed_hours"))
+    
+    frappe.db.sql("""
+        UPDATE `tabProject` p
+        SET p.total_consumed_hours = (
+            SELECT IFNULL(SUM(tsd.billable_hours), 0)
             FROM `tabTimesheet Detail` tsd
             INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
-            WHERE tsd.project = %s
+            WHERE tsd.project = p.name
             AND tsd.approved_by IS NOT NULL
             AND ts.status = 'Submitted'
-        """, doc.name)[0][0] or 0
-        
-        doc.total_consumed_hours = flt(total_consumed, 2)
-        
-        # Check if project is over budget
-        if doc.total_consumed_hours > doc.total_purchased_hours:
-            frappe.msgprint(_("Warning: Project has consumed more hours than purchased!"), 
-                          alert=True, indicator="red")
+        ) + (
+            SELECT IFNULL(SUM(arc.approved_billable_hours), 0)
+            FROM `tabArchived Billing Summary` arc
+            WHERE arc.project = p.name
+        )
+        WHERE p.name = %s
+        AND p.billing_type = 'Hourly Billing'
+    """, project_name)
+    
+    new_consumed = flt(frappe.db.get_value("Project", project_name, "total_consumed_hours"))
+    after_consumed_hours_change(project_name, old_consumed, new_consumed)
+
+def after_consumed_hours_change(project_name, old_consumed, new_consumed):
+    """Refresh everything derived from a project's consumed hours"""
+    if flt(old_consumed, 2) == flt(new_consumed, 2):
+        return
+    
+    record_derived_field_changes(project_name, [["total_consumed_hours", flt(old_consumed, 2), flt(new_consumed, 2)]])
+    invalidate_project_billing([project_name])
+    record_project_change(project_name, flt(new_consumed) - flt(old_consumed), new_consumed)
+    evaluate_budget_thresholds(project_name, old_consumed, new_consumed)
+
+def record_derived_field_changes(project_name, changed):
+    """Add a Version entry for derived billing fields written without a full Project save"""
+    frappe.get_doc({
+        "doctype": "Version",
+        "ref_doctype": "Project",
+        "docname": project_name,
+        "data": frappe.as_json({
+            "changed": changed,
+            "added": [],
+            "removed": [],
+            "row_changed": []
+        })
+    }).insert(ignore_permissions=True)
 
 @frappe.whitelist()
 def get_project_billing_summary(project_name):
-    """Get comprehensive billing summary for a project"""
-    project = frappe.get_doc("Project", project_name)
+    """Get comprehensive billing summary for a project
+    
+    The summary is cached with the project's billing version and only recomputed after the
+    version was bumped by an approval, hour edit, submission or project change. It is computed
+    on the primary, so a lagging replica can never be cached under a new version.
+    """
+    frappe.has_permission("Project", "read", project_name, throw=True)
+
+    # Read the version first: a change committed while computing leaves the cached copy outdated
+    version = get_project_versions([project_name])[project_name]
+    cached = frappe.cache().hget(BILLING_SUMMARY_CACHE_KEY, project_name)
+    if cached and cached.get("version") == version:
+        return cached["data"]
+    
+    summary = compute_project_billing_summary(project_name)
+    frappe.cache().hset(BILLING_SUMMARY_CACHE_KEY, project_name, {"version": version, "data": summary})
+    return summary
+
+def compute_project_billing_summary(project_name):
+    project = frappe.db.get_value("Project", project_name,
+        ["project_name", "billing_type", "total_purchased_hours", "total_consumed_hours", "hourly_rate"],
+        as_dict=True)
+    if not project:
+        frappe.throw(_("Project {0} not found").format(project_name), frappe.DoesNotExistError)
     
     # Get timesheet statistics
     timesheet_stats = frappe.db.sql("""
@@ -65,11 +180,24 @@ def get_project_billing_summary(project_name):
         AND ts.status = 'Submitted'
     """, project_name, as_dict=True)[0]
     
+    # Archived entries are all decided, so they only add to the approved and hour totals
+    archived_stats = frappe.db.sql("""
+        SELECT 
+            SUM(entry_count) as total_entries,
+            SUM(approved_count) as approved_entries,
+            SUM(billable_hours) as total_billable_hours,
+            SUM(non_billable_hours) as total_non_billable_hours
+        FROM `tabArchived Billing Summary`
+        WHERE project = %s
+    """, project_name, as_dict=True)[0]
+    for field, value in archived_stats.items():
+        timesheet_stats[field] = flt(timesheet_stats[field]) + flt(value)
+    
     # Calculate remaining hours
     remaining_hours = (project.total_purchased_hours or 0) - (project.total_consumed_hours or 0)
     consumption_percentage = 0
-    if project.total_purchased_hours > 0:
-        consumption_percentage = (project.total_consumed_hours / project.total_purchased_hours) * 100
+    if flt(project.total_purchased_hours) > 0:
+        consumption_percentage = (flt(project.total_consumed_hours) / project.total_purchased_hours) * 100
     
     return {
         "project_name": project.project_name,
@@ -79,8 +207,9 @@ def get_project_billing_summary(project_name):
         "remaining_hours": remaining_hours,
         "consumption_percentage": consumption_percentage,
         "hourly_rate": project.hourly_rate,
-        "total_billable_amount": project.total_consumed_hours * (project.hourly_rate or 0),
-        "timesheet_stats": timesheet_stats
+        "total_billable_amount": get_billable_amounts([project_name]).get(project_name, 0),
+        "timesheet_stats": timesheet_stats,
+        "computed_at": now_datetime()
     }
 
 @frappe.whitelist()
@@ -92,36 +221,71 @@ def get_project_manager(project_name):
 def approve_timesheet_entries(project_name, timesheet_details, action="approve"):
     """Bulk approve or reject timesheet entries"""
     user = frappe.session.user
+    timesheet_details = frappe.parse_json(timesheet_details)
     
-    # Validate project manager
-    project = frappe.get_doc("Project", project_name)
-    if project.project_manager_user != user:
-        frappe.throw(_("You can only approve entries for your managed projects"))
+    # Validate approver against the cached set of approvable projects
+    validate_can_approve(project_name, user)
+    
+    # Large batches run in the background so the request does not time out
+    if len(timesheet_details) > BACKGROUND_JOB_THRESHOLD:
+        return enqueue_background_job("approval", timesheet_details,
+            project_name=project_name, action=action)
     
     approved_count = 0
+    deltas = {}
     for detail_name in timesheet_details:
-        try:
-            detail = frappe.get_doc("Timesheet Detail", detail_name)
-            
-            if action == "approve":
-                detail.approved_by = user
-                detail.approved_on = now_datetime()
-                detail.approval_status = "Approved"
-                approved_count += 1
-            elif action == "reject":
-                detail.approval_status = "Rejected"
-            
-            detail.save()
-            
-        except Exception as e:
-            frappe.log_error(f"Error processing timesheet detail {detail_name}: {str(e)}")
+        if apply_approval_action(detail_name, user, action, deltas) == "approved":
+            approved_count += 1
     
     # Update project hours after approval
-    if action == "approve" and approved_count > 0:
-        update_project_hours(project, "on_update")
+    apply_consumed_hours_deltas(deltas)
     
     return {
         "message": f"Successfully {action}d {approved_count} timesheet entries",
         "approved_count": approved_count
     }
 
+def apply_approval_action(detail_name, user, action, deltas=None):
+    """Approve or reject a single timesheet detail and return the per-entry result
+    
+    Newly approved billable hours are added per project to deltas when given
+    (touched projects are added with 0).
+    """
+    try:
+        # Locking read: a concurrent approval of the same entry waits here and then sees it approved,
+        # so its hours are added to the delta only once
+        detail = frappe.get_doc("Timesheet Detail", detail_name, for_update=True)
+        if not can_approve(detail.project, user):
+            return "skipped: not your project"
+        was_approved = bool(detail.approved_by)
+        
+        if action == "approve":
+            detail.approved_by = user
+            detail.approved_on = now_datetime()
+            detail.approval_status = "Approved"
+            result = "approved"
+        elif action == "reject":
+            detail.approval_status = "Rejected"
+            result = "rejected"
+        else:
+            return f"error: unknown action {action}"
+        
+        detail.save()
+        
+        # Consumed hours first; the bookkeeping below cannot make an approval skip its hours
+        if deltas is not None and detail.project:
+            deltas.setdefault(detail.project, 0)
+            if result == "approved" and not was_approved:
+                if frappe.db.get_value("Timesheet", detail.parent, "status") == "Submitted":
+                    deltas[detail.project] += flt(detail.billable_hours)
+        
+        record_entry_change(detail)
+        if result == "approved" and not was_approved:
+            record_approval_latency(detail, user)
+        
+        return result
+        
+    except Exception as e:
+        frappe.log_error(f"Error processing timesheet detail {detail_name}: {str(e)}")
+        return f"error: {str(e)}"
+
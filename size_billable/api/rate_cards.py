@@ -0,0 +1,122 @@
+import frappe
+from frappe.utils import flt
+from size_billable.api.versioning import invalidate_project_billing
+
+def set_billing_amount(doc, method):
+    """Store the billing rate and amount of a timesheet detail when it is approved
+
+    The rate is resolved once, on approval, and kept for later hour edits, so amounts can be
+    summed in SQL without resolving rates again. Unapproved entries carry no amount.
+    """
+    if doc.approval_status != "Approved" or not doc.approved_by:
+        doc.billing_rate = 0
+        doc.billing_amount = 0
+        return
+
+    if not flt(doc.billing_rate):
+        doc.billing_rate = resolve_billing_rate(doc)
+
+    doc.billing_amount = flt(doc.billable_hours) * flt(doc.billing_rate)
+
+def resolve_billing_rate(doc):
+    """Get the rate of the most specific rate card effective on the entry's date, or the project's hourly rate"""
+    context = frappe.db.sql("""
+        SELECT ts.start_date, emp.designation, p.hourly_rate
+        FROM `tabTimesheet` ts
+        LEFT JOIN `tabEmployee` emp ON emp.name = ts.employee
+        LEFT JOIN `tabProject` p ON p.name = %(project)s
+        WHERE ts.name = %(timesheet)s
+    """, {"timesheet": doc.parent, "project": doc.project}, as_dict=True)
+
+    if not context:
+        return 0
+    context = context[0]
+
+    rate = get_billing_rate(doc.project, doc.activity_type, context.designation, context.start_date)
+    return flt(rate) if rate is not None else flt(context.hourly_rate)
+
+def get_billing_rate(project, activity_type, designation, date):
+    """Look up the rate card for an entry; None when no card applies
+
+    Blank card columns are stored as '', so IN lists seek the (project, activity_type, designation,
+    from_date) index instead of scanning every card in the date range.
+    """
+    rate = frappe.db.sql("""
+        SELECT rate
+        FROM `tabBilling Rate Card`
+        WHERE project IN (%(project)s, '')
+        AND activity_type IN (%(activity_type)s, '')
+        AND designation IN (%(designation)s, '')
+        AND from_date <= %(date)s
+        AND (to_date IS NULL OR to_date >= %(date)s)
+        ORDER BY
+            project != '' DESC,
+            activity_type != '' DESC,
+            designation != '' DESC,
+            from_date DESC
+        LIMIT 1
+    """, {
+        "project": project or "",
+        "activity_type": activity_type or "",
+        "designation": designation or "",
+        "date": date
+    })
+
+    return rate[0][0] if rate else None
+
+def backfill_billing_rates():
+    """Store the project hourly rate on approved entries approved before rate cards existed
+
+    Runs once from the backfill_billing_rates patch.
+    """
+    # Projects whose stored amounts change, so their cached billing summaries are dropped
+    project_names = frappe.db.sql("""
+        SELECT DISTINCT project
+        FROM `tabTimesheet Detail`
+        WHERE approval_status = 'Approved'
+        AND approved_by IS NOT NULL
+        AND IFNULL(project, '') != ''
+        AND (
+            IFNULL(billing_rate, 0) = 0
+            OR IFNULL(billing_amount, 0) != IFNULL(billable_hours, 0) * IFNULL(billing_rate, 0)
+        )
+    """, pluck=True)
+
+    frappe.db.sql("""
+        UPDATE `tabTimesheet Detail` tsd
+        INNER JOIN `tabProject` p ON tsd.project = p.name
+        SET tsd.billing_rate = IFNULL(p.hourly_rate, 0)
+        WHERE tsd.approval_status = 'Approved'
+        AND tsd.approved_by IS NOT NULL
+        AND IFNULL(tsd.billing_rate, 0) = 0
+    """)
+    frappe.db.sql("""
+        UPDATE `tabTimesheet Detail`
+        SET billing_amount = IFNULL(billable_hours, 0) * IFNULL(billing_rate, 0)
+        WHERE approval_status = 'Approved'
+        AND approved_by IS NOT NULL
+    """)
+    invalidate_project_billing(project_names)
+    frappe.db.commit()
+
+def get_billable_amounts(project_names):
+    """Get the stored billing amount of approved entries per project, live and archived, in one query"""
+    if not project_names:
+        return {}
+
+    return {project: flt(amount) for project, amount in frappe.db.sql("""
+        SELECT project, SUM(amount)
+        FROM (
+            SELECT tsd.project, tsd.billing_amount as amount
+            FROM `tabTimesheet Detail` tsd
+            INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+            WHERE tsd.project IN %(projects)s
+            AND tsd.approved_by IS NOT NULL
+            AND ts.status = 'Submitted'
+            UNION ALL
+            SELECT arc.project, arc.billable_amount as amount
+            FROM `tabArchived Billing Summary` arc
+            WHERE arc.project IN %(projects)s
+        ) amounts
+        GROUP BY project
+    """, {"projects": list(project_names)})}
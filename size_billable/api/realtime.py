@@ -0,0 +1,106 @@
+import frappe
+from frappe.utils import flt
+from frappe.utils.caching import request_cache
+
+CHANGE_EVENT = "size_billable_billing_change"
+
+# Entry fields customers may see, matching what get_billing_data returns
+CUSTOMER_ENTRY_FIELDS = ("name", "project", "task", "activity_type", "description", "employee_name",
+    "date", "billable_hours", "approved_by", "approved_on")
+
+def record_entry_change(detail):
+    """Queue a compact change event for a timesheet detail, published once the transaction commits"""
+    timesheet = get_timesheet_info(detail.parent)
+
+    get_pending_changes()["entries"][detail.name] = {
+        "name": detail.name,
+        "project": detail.project,
+        "task": detail.task,
+        "activity_type": detail.activity_type,
+        "description": detail.description,
+        "employee_name": timesheet.get("employee_name"),
+        "date": timesheet["start_date"].isoformat() if timesheet.get("start_date") else None,
+        "hours": flt(detail.hours),
+        "billable_hours": flt(detail.billable_hours),
+        "non_billable_hours": flt(detail.non_billable_hours),
+        "approval_status": detail.approval_status,
+        "approved_by": detail.approved_by,
+        "approved_on": detail.approved_on.isoformat() if hasattr(detail.approved_on, "isoformat") else detail.approved_on
+    }
+
+@request_cache
+def get_timesheet_info(timesheet_name):
+    """Employee and date of a timesheet, memoized for the request since bulk actions touch many of its entries"""
+    return frappe.db.get_value("Timesheet", timesheet_name, ["employee_name", "start_date"], as_dict=True) or {}
+
+def record_project_change(project_name, delta, total_consumed_hours):
+    """Queue the consumed-hours change of a project for the next change event"""
+    projects = get_pending_changes()["projects"]
+    change = projects.setdefault(project_name, {"project": project_name, "delta": 0})
+    change["delta"] = flt(change["delta"] + flt(delta), 2)
+    change["total_consumed_hours"] = flt(total_consumed_hours, 2)
+
+def get_pending_changes():
+    pending = frappe.flags.get("size_billable_pending_changes")
+    if pending is None:
+        pending = frappe.flags.size_billable_pending_changes = {"entries": {}, "projects": {}}
+        frappe.db.after_commit.add(publish_pending_changes)
+        frappe.db.after_rollback.add(discard_pending_changes)
+    return pending
+
+def discard_pending_changes():
+    frappe.flags.pop("size_billable_pending_changes", None)
+
+def publish_pending_changes():
+    """Publish queued changes to each project's manager and customer users"""
+    pending = frappe.flags.pop("size_billable_pending_changes", None)
+    if not pending:
+        return
+
+    entries_by_project = {}
+    for entry in pending["entries"].values():
+        entries_by_project.setdefault(entry["project"], []).append(entry)
+
+    project_names = set(entries_by_project) | set(pending["projects"])
+    project_names.discard(None)
+    if not project_names:
+        return
+
+    projects = frappe.get_all("Project",
+        filters={"name": ["in", list(project_names)]},
+        fields=["name", "customer", "project_manager_user"]
+    )
+
+    customers = {p.customer for p in projects if p.customer}
+    customer_users = {}
+    if customers:
+        for user in frappe.get_all("User",
+            filters={"customer": ["in", list(customers)], "enabled": 1},
+            fields=["name", "customer"]
+        ):
+            customer_users.setdefault(user.customer, []).append(user.name)
+
+    # Managers see every change; customers only entries visible to them (approved_by set) and project totals
+    messages = {}
+    for project in projects:
+        entries = entries_by_project.get(project.name, [])
+        project_change = pending["projects"].get(project.name)
+
+        if project.project_manager_user:
+            add_to_message(messages, project.project_manager_user, entries, project_change)
+
+        approved_entries = [
+            {key: value for key, value in e.items() if key in CUSTOMER_ENTRY_FIELDS}
+            for e in entries if e["approved_by"]
+        ]
+        for user in customer_users.get(project.customer, []):
+            add_to_message(messages, user, approved_entries, project_change)
+
+    for user, message in messages.items():
+        frappe.publish_realtime(CHANGE_EVENT, message, user=user)
+
+def add_to_message(messages, user, entries, project_change):
+    message = messages.setdefault(user, {"entries": [], "projects": []})
+    message["entries"].extend(entries)
+    if project_change:
+        message["projects"].append(project_change)
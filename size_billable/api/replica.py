@@ -0,0 +1,140 @@
+import functools
+
+import frappe
+from frappe.utils import cint, flt, now_datetime, get_datetime
+
+HEARTBEAT_KEY = "size_billable_replica_heartbeat"
+
+# Seconds of replication lag each endpoint accepts; override per endpoint (or "default")
+# with "size_billable_replica_max_lag" in site config. 0 always reads from the primary.
+DEFAULT_MAX_LAG = {
+    "default": 60,
+    "customer_portal": 60,
+    "report": 300,
+    "system_health": 600
+}
+
+def replica_read(endpoint):
+    """Run a read-only function against the replica configured with read_from_replica/replica_host
+
+    The primary is used instead when no replica is configured, when the request has already
+    written (so it reads its own writes), when the replica cannot be reached or when its lag
+    exceeds what the endpoint accepts. Nested calls reuse the connection of the outermost one.
+
+    Calls carrying a version token read from the primary: tokens change when the primary
+    commits, and pairing a new token with lagging data would leave the client holding stale
+    data as "not modified" until the next change.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if kwargs.get("version") is not None:
+                return primary_read(fn)(*args, **kwargs)
+
+            if not switch_to_replica(endpoint):
+                return fn(*args, **kwargs)
+
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                switch_to_primary()
+        return wrapper
+    return decorator
+
+def primary_read(fn):
+    """Keep a function, and every replica_read call inside it, on the primary
+
+    For results that are cached or versioned, which must never be built from lagging data.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        previous = frappe.flags.size_billable_primary_only
+        frappe.flags.size_billable_primary_only = True
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            frappe.flags.size_billable_primary_only = previous
+    return wrapper
+
+def switch_to_replica(endpoint):
+    """Swap frappe.db for the replica with frappe.connect_replica; return False when the primary should be used"""
+    if not cint(frappe.conf.read_from_replica) or not frappe.conf.replica_host:
+        return False
+
+    if frappe.flags.size_billable_primary_only:
+        return False
+
+    # Already on the replica (ours or frappe.read_only's), or this request has pending writes
+    # it must be able to read back
+    if hasattr(frappe.local, "primary_db") or frappe.db.transaction_writes:
+        return False
+
+    max_lag = get_max_lag(endpoint)
+    if max_lag <= 0:
+        return False
+
+    try:
+        if not frappe.connect_replica():
+            return False
+        lag = get_replica_lag(frappe.local.db)
+    except Exception as e:
+        if hasattr(frappe.local, "primary_db"):
+            switch_to_primary()
+        frappe.logger().warning(f"Replica unavailable for {endpoint}, reading from primary: {str(e)}")
+        return False
+
+    if lag is None or lag > max_lag:
+        switch_to_primary()
+        return False
+
+    return True
+
+def switch_to_primary():
+    """Undo frappe.connect_replica, so later calls in the request can switch again"""
+    replica = frappe.local.db
+    frappe.local.db = frappe.local.primary_db
+    del frappe.local.primary_db
+    if hasattr(frappe.local, "replica_db"):
+        del frappe.local.replica_db
+    replica.close()
+
+def get_max_lag(endpoint):
+    overrides = frappe.conf.get("size_billable_replica_max_lag") or {}
+    for key in (endpoint, "default"):
+        if key in overrides:
+            return flt(overrides[key])
+        if key in DEFAULT_MAX_LAG:
+            return flt(DEFAULT_MAX_LAG[key])
+    return 0
+
+def get_replica_lag(replica):
+    """Seconds the replica is behind, comparing the heartbeat it has with the one last written
+
+    Returns None when no heartbeat is known yet, so the primary is used until the
+    heartbeat job has run once.
+    """
+    primary_heartbeat = frappe.cache().get_value(HEARTBEAT_KEY)
+    replica_heartbeat = replica.sql("""
+        SELECT defvalue
+        FROM `tabDefaultValue`
+        WHERE parent = '__default'
+        AND defkey = %s
+    """, HEARTBEAT_KEY)
+
+    if not primary_heartbeat or not replica_heartbeat or not replica_heartbeat[0][0]:
+        return None
+
+    lag = (get_datetime(primary_heartbeat) - get_datetime(replica_heartbeat[0][0])).total_seconds()
+    return max(lag, 0)
+
+def write_replica_heartbeat():
+    """Scheduled every minute: write a heartbeat on the primary for replicas to catch up to"""
+    if not cint(frappe.conf.read_from_replica):
+        return
+
+    heartbeat = str(now_datetime())
+    frappe.db.set_default(HEARTBEAT_KEY, heartbeat)
+    frappe.db.commit()
+
+    # Only published once committed, so a replica is never judged against an uncommitted value
+    frappe.cache().set_value(HEARTBEAT_KEY, heartbeat)
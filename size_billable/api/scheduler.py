@@ -1,6 +1,9 @@
 import frappe
 from frappe.utils import now_datetime, add_days
 from frappe import _
+from size_billable.api.project import recompute_project_consumed_hours
+from size_billable.api.replica import replica_read
+from size_billable.api.approval_latency import get_latency_overview
 
 def update_project_hours_daily():
     """Daily task to update project consumed hours"""
@@ -16,8 +19,11 @@ def update_project_hours_daily():
     for project in projects:
         try:
             update_project_consumed_hours(project.name)
+            # Commit per project so no project row stays locked for the whole run
+            frappe.db.commit()
             updated_count += 1
         except Exception as e:
+            frappe.db.rollback()
             frappe.logger().error(f"Error updating project {project.name}: {str(e)}")
     
     frappe.logger().info(f"Updated {updated_count} projects")
@@ -40,20 +46,7 @@ def generate_billing_reports():
 
 def update_project_consumed_hours(project_name):
     """Update consumed hours for a specific project"""
-    project = frappe.get_doc("Project", project_name)
-    
-    if project.billing_type == "Hourly Billing":
-        total_consumed = frappe.db.sql("""
-            SELECT SUM(tsd.billable_hours)
-            FROM `tabTimesheet Detail` tsd
-            INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
-            WHERE tsd.project = %s
-            AND tsd.approved_by IS NOT NULL
-            AND ts.status = 'Submitted'
-        """, project_name)[0][0] or 0
-        
-        project.total_consumed_hours = total_consumed
-        project.save()
+    recompute_project_consumed_hours(project_name)
 
 def generate_customer_billing_report(customer_name):
     """Generate billing report for a customer"""
@@ -61,6 +54,7 @@ def generate_customer_billing_report(customer_name):
     pass
 
 @frappe.whitelist()
+@replica_read("system_health")
 def get_system_health():
     """Get system health metrics for Size Billable"""
     # Get pending approvals count
@@ -72,26 +66,39 @@ def get_system_health():
         AND ts.status = 'Submitted'
     """)[0][0]
     
-    # Get over-budget projects
+    # Get over-budget projects (flag maintained by the budget alert engine)
     over_budget_projects = frappe.db.sql("""
         SELECT COUNT(*)
         FROM `tabProject`
-        WHERE billing_type = 'Hourly Billing'
-        AND total_consumed_hours > total_purchased_hours
+        WHERE over_budget = 1
         AND status = 'Open'
     """)[0][0]
     
-    # Get total billable amount
+    # Get total billable amount from the amounts stored on approval
     total_billable = frappe.db.sql("""
-        SELECT SUM(p.total_consumed_hours * p.hourly_rate)
-        FROM `tabProject` p
-        WHERE p.billing_type = 'Hourly Billing'
-        AND p.status = 'Open'
+        SELECT
+            IFNULL((
+                SELECT SUM(tsd.billing_amount)
+                FROM `tabTimesheet Detail` tsd
+                INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+                INNER JOIN `tabProject` p ON tsd.project = p.name
+                WHERE tsd.approved_by IS NOT NULL
+                AND ts.status = 'Submitted'
+                AND p.billing_type = 'Hourly Billing'
+                AND p.status = 'Open'
+            ), 0) + IFNULL((
+                SELECT SUM(arc.billable_amount)
+                FROM `tabArchived Billing Summary` arc
+                INNER JOIN `tabProject` p ON arc.project = p.name
+                WHERE p.billing_type = 'Hourly Billing'
+                AND p.status = 'Open'
+            ), 0)
     """)[0][0] or 0
     
     return {
         "pending_approvals": pending_approvals,
         "over_budget_projects": over_budget_projects,
         "total_billable_amount": total_billable,
+        "approval_latency": get_latency_overview(),
         "timestamp": now_datetime()
     }
\ No newline at end of file
@@ -0,0 +1,140 @@
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+from size_billable.api.replica import replica_read
+
+SEARCH_TABLE = "tabTimesheet Search Entry"
+
+# Detail rows indexed per statement when rebuilding
+REBUILD_CHUNK_SIZE = 5000
+
+MAX_PAGE_LENGTH = 100
+
+# InnoDB's default innodb_ft_min_token_size; shorter words are not indexed and can never match
+MIN_QUERY_LENGTH = 3
+
+@frappe.whitelist()
+@replica_read("customer_portal")
+def search_billing_entries(query, project_name=None, page=1, page_length=20):
+    """Search the approved entries of the current customer's projects, best matches first
+
+    Matches description, task subject and activity type through a full-text index. The customer
+    is taken from the project at query time, so a project moved to another customer leaves the old one.
+    """
+    query = (query or "").strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        frappe.throw(_("Search text must be at least {0} characters").format(MIN_QUERY_LENGTH))
+
+    customer_name = frappe.get_value("User", frappe.session.user, "customer")
+    if not customer_name:
+        frappe.throw(_("No customer associated with this user"))
+
+    page = max(cint(page), 1)
+    page_length = min(max(cint(page_length), 1), MAX_PAGE_LENGTH)
+
+    conditions = """
+        WHERE p.customer = %(customer)s
+        AND MATCH(se.content) AGAINST (%(query)s IN NATURAL LANGUAGE MODE)
+    """
+    params = {
+        "customer": customer_name,
+        "query": query,
+        "limit": page_length,
+        "offset": (page - 1) * page_length
+    }
+    if project_name:
+        conditions += " AND se.project = %(project)s"
+        params["project"] = project_name
+
+    results = frappe.db.sql(f"""
+        SELECT
+            se.name as timesheet_detail,
+            se.project,
+            se.entry_date,
+            se.employee_name,
+            se.task_subject,
+            se.activity_type,
+            se.billable_hours,
+            se.description,
+            MATCH(se.content) AGAINST (%(query)s IN NATURAL LANGUAGE MODE) as score
+        FROM `{SEARCH_TABLE}` se
+        INNER JOIN `tabProject` p ON se.project = p.name
+        {conditions}
+        ORDER BY score DESC, se.entry_date DESC
+        LIMIT %(limit)s OFFSET %(offset)s
+    """, params, as_dict=True)
+
+    total = frappe.db.sql(f"""
+        SELECT COUNT(*)
+        FROM `{SEARCH_TABLE}` se
+        INNER JOIN `tabProject` p ON se.project = p.name
+        {conditions}
+    """, params)[0][0]
+
+    return {
+        "results": results,
+        "total": total,
+        "page": page,
+        "page_length": page_length
+    }
+
+def index_entries(detail_condition, params=None):
+    """Write the search rows of approved entries matching a condition on tsd, in one statement"""
+    now = now_datetime()
+    frappe.db.sql(f"""
+        REPLACE INTO `{SEARCH_TABLE}` (
+            name, creation, modified, owner, modified_by, docstatus,
+            project, timesheet, entry_date, employee_name, task, task_subject,
+            activity_type, billable_hours, description, content
+        )
+        SELECT
+            tsd.name, %(now)s, %(now)s, 'Administrator', 'Administrator', 0,
+            tsd.project, ts.name, ts.start_date, ts.employee_name, tsd.task, t.subject,
+            tsd.activity_type, tsd.billable_hours, tsd.description,
+            CONCAT_WS(' ', tsd.description, t.subject, tsd.activity_type)
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        LEFT JOIN `tabTask` t ON tsd.task = t.name
+        WHERE {detail_condition}
+        AND tsd.approval_status = 'Approved'
+        AND tsd.approved_by IS NOT NULL
+        AND ts.status = 'Submitted'
+    """, dict(params or {}, now=now))
+
+def update_search_entry(doc, method):
+    """Timesheet Detail on_update: keep the search row in step with approvals and hour edits"""
+    if doc.approval_status == "Approved" and doc.approved_by:
+        index_entries("tsd.name = %(name)s", {"name": doc.name})
+    else:
+        frappe.db.sql(f"DELETE FROM `{SEARCH_TABLE}` WHERE name = %s", doc.name)
+
+def update_task_entries(doc, method):
+    """Task on_update: re-index the task's approved entries when its subject changes"""
+    if doc.has_value_changed("subject"):
+        index_entries("tsd.task = %(task)s", {"task": doc.name})
+
+def remove_timesheet_entries(timesheet_name):
+    """Drop the search rows of a timesheet whose entries return to the approval queue"""
+    frappe.db.sql(f"DELETE FROM `{SEARCH_TABLE}` WHERE timesheet = %s", timesheet_name)
+
+def rebuild_search_index():
+    """Index every approved entry in chunks
+
+    Runs once from the rebuild_search_index patch.
+    """
+    last_name = ""
+    while True:
+        names = frappe.db.sql("""
+            SELECT name
+            FROM `tabTimesheet Detail`
+            WHERE name > %s
+            AND approval_status = 'Approved'
+            ORDER BY name
+            LIMIT %s
+        """, (last_name, REBUILD_CHUNK_SIZE), pluck=True)
+        if not names:
+            break
+
+        index_entries("tsd.name IN %(names)s", {"names": names})
+        frappe.db.commit()
+        last_name = names[-1]
@@ -1,21 +1,102 @@
 import frappe
 from frappe import _
+from size_billable.api.versioning import get_manager_version_token, conditional_response
+
+TASK_IMPORT_CHUNK_SIZE = 500
 
 def validate_task_creation(doc, method):
     """Validate that only project managers can create tasks for their projects"""
     if not doc.project:
         return
     
-    # Get project manager for this project
-    project_manager = frappe.get_value("Project", doc.project, "project_manager_user")
+    # Get project manager for this project (memoized per project for imports and bulk creation)
+    project_manager = get_project_managers([doc.project]).get(doc.project)
     
+    error = get_task_creation_error(project_manager, frappe.session.user)
+    if error:
+        frappe.throw(error)
+
+def get_task_creation_error(project_manager, user):
+    """Return why user may not create a task for a project with this manager, or None"""
     if not project_manager:
-        frappe.throw(_("Project Manager not assigned to this project. Please contact administrator."))
+        return _("Project Manager not assigned to this project. Please contact administrator.")
     
     # Check if current user is the project manager
-    if frappe.session.user != project_manager:
-        frappe.throw(_("Only the assigned Project Manager can create tasks for this project. "
-                      "Please contact the Project Manager: {0}").format(project_manager))
+    if user != project_manager:
+        return _("Only the assigned Project Manager can create tasks for this project. "
+                 "Please contact the Project Manager: {0}").format(project_manager)
+
+def get_project_managers(project_names):
+    """Resolve project managers for many projects with one query, memoized for the request or job
+    
+    Data Import runs all rows in one job, so each project is looked up once instead of once per row.
+    """
+    managers = frappe.flags.get("size_billable_project_managers")
+    if managers is None:
+        managers = frappe.flags.size_billable_project_managers = {}
+    
+    missing = [name for name in set(project_names) if name and name not in managers]
+    if missing:
+        found = dict(frappe.get_all("Project",
+            filters={"name": ["in", missing]},
+            fields=["name", "project_manager_user"],
+            as_list=True
+        ))
+        for name in missing:
+            managers[name] = found.get(name)
+    
+    return managers
+
+@frappe.whitelist()
+def bulk_create_tasks(tasks):
+    """Create many tasks at once; the batch is validated in memory and inserted in chunks
+    
+    Returns counts, the created task names and per-row errors (row index is 0-based).
+    """
+    tasks = frappe.parse_json(tasks)
+    user = frappe.session.user
+    
+    managers = get_project_managers([task.get("project") for task in tasks])
+    
+    errors = []
+    valid_rows = []
+    for index, task in enumerate(tasks):
+        if not task.get("subject"):
+            errors.append({"row": index, "error": _("Subject is required")})
+            continue
+        
+        if task.get("project"):
+            error = get_task_creation_error(managers.get(task["project"]), user)
+            if error:
+                errors.append({"row": index, "subject": task["subject"], "error": error})
+                continue
+        
+        valid_rows.append((index, task))
+    
+    created = []
+    for start in range(0, len(valid_rows), TASK_IMPORT_CHUNK_SIZE):
+        for index, task in valid_rows[start:start + TASK_IMPORT_CHUNK_SIZE]:
+            # A failing row is rolled back on its own without losing the rest of the chunk
+            frappe.db.savepoint("size_billable_task_row")
+            try:
+                doc = frappe.get_doc({**task, "doctype": "Task"})
+                doc.insert()
+                created.append(doc.name)
+            except Exception as e:
+                frappe.db.rollback(save_point="size_billable_task_row")
+                errors.append({"row": index, "subject": task.get("subject"), "error": str(e)})
+        
+        frappe.db.commit()
+    
+    errors.sort(key=lambda error: error["row"])
+    
+    return {
+        "message": _("Created {0} tasks, {1} failed").format(len(created), len(errors)),
+        "created_count": len(created),
+        "failed_count": len(errors),
+        "created": created,
+        "errors": errors
+    }
 
 @frappe.whitelist()
 def get_project_manager_tasks(project_name):
@@ -37,10 +118,15 @@ def get_project_manager_tasks(project_name):
     return tasks
 
 @frappe.whitelist()
-def get_manager_projects():
+def get_manager_projects(version=None):
     """Get projects managed by current user for filtering"""
     user = frappe.session.user
     
+    # Answer "not modified" when the client's version token is still current
+    if version is not None:
+        token = get_manager_version_token("get_manager_projects")
+        return conditional_response(version, token, get_manager_projects)
+    
     projects = frappe.get_all("Project",
         filters={"project_manager_user": user, "status": ["!=", "Cancelled"]},
         fields=["name", "project_name"],
@@ -1,6 +1,13 @@
 import frappe
 from frappe import _
-from frappe.utils import flt, now_datetime
+from frappe.utils import cint, flt, now_datetime
+from size_billable.api.project import recompute_project_consumed_hours
+from size_billable.api.versioning import invalidate_project_billing, get_manager_version_token, conditional_response
+from size_billable.api.billing_period import validate_timesheet_periods_open
+from size_billable.api.archival import validate_timesheet_not_archived
+from size_billable.api.approvers import get_approvable_projects_query
+from size_billable.api.search import remove_timesheet_entries
+from size_billable.api.permissions import get_timesheet_detail_conditions
 
 def calculate_billable_hours(doc, method):
     """Calculate and validate billable hours for timesheet entries"""
@@ -8,19 +15,7 @@ def calculate_billable_hours(doc, method):
     total_non_billable = 0
     
     for row in doc.time_logs:
-        # Initialize billable hours if not set
-        if not row.billable_hours:
-            row.billable_hours = 0
-        
-        # Calculate non-billable hours
-        row.non_billable_hours = flt(row.hours) - flt(row.billable_hours)
-        
-        # Validate hour distribution
-        if flt(row.billable_hours) < 0:
-            frappe.throw(_("Billable hours cannot be negative"))
-        
-        if flt(row.non_billable_hours) < 0:
-            frappe.throw(_("Non-billable hours cannot be negative"))
+        validate_time_log_hours(row)
         
         total_billable += flt(row.billable_hours)
         total_non_billable += flt(row.non_billable_hours)
@@ -29,108 +24,194 @@ def calculate_billable_hours(doc, method):
     doc.total_billable_hours = total_billable
     doc.total_non_billable_hours = total_non_billable
 
+def validate_time_log_hours(row):
+    """Set non-billable hours of a time log and validate the hour distribution"""
+    # Initialize billable hours if not set
+    if not row.billable_hours:
+        row.billable_hours = 0
+    
+    # Calculate non-billable hours
+    row.non_billable_hours = flt(row.hours) - flt(row.billable_hours)
+    
+    # Validate hour distribution
+    if flt(row.billable_hours) < 0:
+        frappe.throw(_("Billable hours cannot be negative"))
+    
+    if flt(row.non_billable_hours) < 0:
+        frappe.throw(_("Non-billable hours cannot be negative"))
+
 def lock_timesheet_entries(doc, method):
     """Lock timesheet entries after submission - only manager can modify"""
-    for row in doc.time_logs:
-        # Reset approval fields for new submission
-        row.approved_by = None
-        row.approved_on = None
-        row.approval_status = "Pending"
-        row.save()
+    validate_timesheet_periods_open(doc)
+    
+    # Reset approval fields for new submission; the entries enter the approval queue now
+    reset_approval_fields(doc, submitted_on=now_datetime())
     
     # Update project consumed hours
-    if doc.parent_project:
-        update_project_consumed_hours(doc.parent_project)
+    recompute_timesheet_projects(doc)
 
 def unlock_timesheet_entries(doc, method):
     """Unlock timesheet entries when timesheet is cancelled"""
+    validate_timesheet_periods_open(doc)
+    validate_timesheet_not_archived(doc)
+    reset_approval_fields(doc)
+    
+    # Recalculate project consumed hours
+    recompute_timesheet_projects(doc)
+
+def reset_approval_fields(doc, submitted_on=None):
+    """Reset approval fields of all time logs with one UPDATE instead of a save per row"""
+    frappe.db.sql("""
+        UPDATE `tabTimesheet Detail`
+        SET approved_by = NULL,
+            approved_on = NULL,
+            approval_status = 'Pending',
+            billing_rate = 0,
+            billing_amount = 0,
+            submitted_on = %s
+        WHERE parent = %s
+        AND parenttype = 'Timesheet'
+    """, (submitted_on, doc.name))
+    
     for row in doc.time_logs:
         row.approved_by = None
         row.approved_on = None
         row.approval_status = "Pending"
-        row.save()
+        row.billing_rate = 0
+        row.billing_amount = 0
+        row.submitted_on = submitted_on
     
-    # Recalculate project consumed hours
+    # Entries back in the approval queue are no longer searchable by customers
+    remove_timesheet_entries(doc.name)
+
+def recompute_timesheet_projects(doc):
+    """Recompute consumed hours of the timesheet's projects, or defer it during bulk ingestion"""
+    projects = get_timesheet_projects(doc)
+    
+    # Bulk ingestion collects projects and recomputes each one once at the end
+    deferred = frappe.flags.get("size_billable_deferred_projects")
+    if deferred is not None:
+        deferred.update(projects)
+    else:
+        for project_name in projects:
+            update_project_consumed_hours(project_name)
+    
+    invalidate_project_billing(projects)
+
+def get_timesheet_projects(doc):
+    """Get every project touched by a timesheet, sorted so project rows are locked in a consistent order"""
+    projects = {row.project for row in doc.time_logs if row.project}
     if doc.parent_project:
-        update_project_consumed_hours(doc.parent_project)
+        projects.add(doc.parent_project)
+    return sorted(projects)
 
 def update_project_consumed_hours(project_name):
     """Update total consumed hours for a project"""
-    project = frappe.get_doc("Project", project_name)
-    
-    if project.billing_type == "Hourly Billing":
-        total_consumed = frappe.db.sql("""
-            SELECT SUM(tsd.billable_hours)
-            FROM `tabTimesheet Detail` tsd
-            INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
-            WHERE tsd.project = %s
-            AND tsd.approved_by IS NOT NULL
-            AND ts.status = 'Submitted'
-        """, project_name)[0][0] or 0
-        
-        project.total_consumed_hours = flt(total_consumed, 2)
-        project.save()
+    recompute_project_consumed_hours(project_name)
 
 @frappe.whitelist()
 def get_timesheet_approval_status(timesheet_name):
     """Get approval status for all entries in a timesheet"""
-    timesheet = frappe.get_doc("Timesheet", timesheet_name)
-    
-    approval_summary = {
-        "total_entries": len(timesheet.time_logs),
+    return get_timesheets_approval_status([timesheet_name], include_entries=1).get(timesheet_name) or {
+        "total_entries": 0,
         "pending_entries": 0,
         "approved_entries": 0,
         "rejected_entries": 0,
         "entries": []
     }
+
+@frappe.whitelist()
+def get_timesheets_approval_status(timesheet_names, include_entries=0):
+    """Get approval status counts of many timesheets from one grouped query
+    
+    Per-entry rows are only read with include_entries=1. Timesheets the user cannot read are left out.
+    """
+    timesheet_names = frappe.parse_json(timesheet_names) if isinstance(timesheet_names, str) else timesheet_names
+    if not timesheet_names:
+        return {}
+    
+    # Permission rules are applied in the list query, without loading documents
+    permitted = frappe.get_list("Timesheet", filters={"name": ["in", timesheet_names]}, pluck="name")
+    if not permitted:
+        return {}
+    
+    # Rows are filtered too: a readable timesheet can hold rows of projects the user may not see
+    row_conditions = get_timesheet_detail_conditions(frappe.session.user)
+    row_conditions = f"AND {row_conditions}" if row_conditions else ""
     
-    for row in timesheet.time_logs:
-        status = {
-            "name": row.name,
-            "project": row.project,
-            "task": row.task,
-            "activity_type": row.activity_type,
-            "hours": row.hours,
-            "billable_hours": row.billable_hours,
-            "non_billable_hours": row.non_billable_hours,
-            "approval_status": row.approval_status,
-            "approved_by": row.approved_by,
-            "approved_on": row.approved_on
+    counts = frappe.db.sql(f"""
+        SELECT
+            parent,
+            COUNT(*) as total_entries,
+            SUM(approval_status = 'Pending') as pending_entries,
+            SUM(approval_status = 'Approved') as approved_entries,
+            SUM(approval_status = 'Rejected') as rejected_entries
+        FROM `tabTimesheet Detail`
+        WHERE parent IN %s
+        AND parenttype = 'Timesheet'
+        {row_conditions}
+        GROUP BY parent
+    """, [permitted], as_dict=True)
+    
+    approval_summary = {}
+    for row in counts:
+        approval_summary[row.parent] = {
+            "total_entries": row.total_entries,
+            "pending_entries": cint(row.pending_entries),
+            "approved_entries": cint(row.approved_entries),
+            "rejected_entries": cint(row.rejected_entries)
         }
+    
+    if cint(include_entries):
+        for summary in approval_summary.values():
+            summary["entries"] = []
         
-        approval_summary["entries"].append(status)
+        entries = frappe.db.sql(f"""
+            SELECT
+                parent,
+                name,
+                project,
+                task,
+                activity_type,
+                hours,
+                billable_hours,
+                non_billable_hours,
+                approval_status,
+                approved_by,
+                approved_on
+            FROM `tabTimesheet Detail`
+            WHERE parent IN %s
+            AND parenttype = 'Timesheet'
+            {row_conditions}
+            ORDER BY parent, idx
+        """, [permitted], as_dict=True)
         
-        if row.approval_status == "Pending":
-            approval_summary["pending_entries"] += 1
-        elif row.approval_status == "Approved":
-            approval_summary["approved_entries"] += 1
-        elif row.approval_status == "Rejected":
-            approval_summary["rejected_entries"] += 1
+        for entry in entries:
+            approval_summary[entry.pop("parent")]["entries"].append(entry)
     
     return approval_summary
 
 @frappe.whitelist()
-def get_manager_timesheets(project_name=None, status="Pending"):
+def get_manager_timesheets(project_name=None, status="Pending", version=None):
     """Get timesheets for manager approval"""
     user = frappe.session.user
     
-    # Get projects managed by current user
-    managed_projects = frappe.get_all("Project", 
-        filters={"project_manager_user": user},
-        pluck="name"
-    )
+    # Answer "not modified" when the client's version token is still current
+    if version is not None:
+        token = get_manager_version_token("get_manager_timesheets", project_name, status)
+        return conditional_response(version, token, lambda: get_manager_timesheets(project_name, status))
     
-    if not managed_projects:
-        return []
+    # Projects the current user manages or approves are selected in the query itself
+    conditions = f"tsd.project IN ({get_approvable_projects_query(user)})"
+    params = {"status": status}
     
     # Filter by specific project if provided
-    if project_name and project_name in managed_projects:
-        project_filter = project_name
-    else:
-        project_filter = ["in", managed_projects]
+    if project_name:
+        conditions += " AND tsd.project = %(project)s"
+        params["project"] = project_name
     
     # Get timesheet details
-    timesheet_details = frappe.db.sql("""
+    timesheet_details = frappe.db.sql(f"""
         SELECT 
             tsd.name,
             tsd.parent as timesheet_name,
@@ -153,23 +234,29 @@ def get_manager_timesheets(project_name=None, status="Pending"):
         FROM `tabTimesheet Detail` tsd
         INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
         INNER JOIN `tabProject` p ON tsd.project = p.name
-        WHERE tsd.project = %s
+        WHERE {conditions}
         AND ts.status = 'Submitted'
-        AND tsd.approval_status = %s
+        AND tsd.approval_status = %(status)s
         ORDER BY ts.start_date DESC, ts.employee_name
-    """, (project_filter, status), as_dict=True)
+    """, params, as_dict=True)
     
     return timesheet_details
 
 @frappe.whitelist()
-def get_manager_projects():
-    """Get projects managed by current user for filtering"""
+def get_manager_projects(version=None):
+    """Get projects the current user manages or approves for filtering"""
     user = frappe.session.user
     
-    projects = frappe.get_all("Project",
-        filters={"project_manager_user": user, "status": ["!=", "Cancelled"]},
-        fields=["name", "project_name"],
-        order_by="project_name"
-    )
+    if version is not None:
+        token = get_manager_version_token("get_manager_projects")
+        return conditional_response(version, token, get_manager_projects)
+    
+    projects = frappe.db.sql(f"""
+        SELECT name, project_name
+        FROM `tabProject`
+        WHERE name IN ({get_approvable_projects_query(user)})
+        AND status != 'Cancelled'
+        ORDER BY project_name
+    """, as_dict=True)
     
     return projects
\ No newline at end of file
@@ -1,6 +1,10 @@
 import frappe
 from frappe import _
 from frappe.utils import flt
+from size_billable.api.project import apply_consumed_hours_deltas
+from size_billable.api.realtime import record_entry_change
+from size_billable.api.approval_jobs import BACKGROUND_JOB_THRESHOLD, enqueue_background_job
+from size_billable.api.approvers import can_approve
 
 def validate_hour_distribution(doc, method):
     """Validate that billable + non-billable = total hours"""
@@ -27,21 +31,27 @@ def update_approval_status(doc, method):
 def update_timesheet_hours(timesheet_detail, billable_hours, non_billable_hours):
     """Update hours for a timesheet detail entry"""
     user = frappe.session.user
-    doc = frappe.get_doc("Timesheet Detail", timesheet_detail)
+    # Locked, so old_billable is the committed value and concurrent edits do not double-count the delta
+    doc = frappe.get_doc("Timesheet Detail", timesheet_detail, for_update=True)
     
-    # Validate project manager
-    project = frappe.get_doc("Project", doc.project)
-    if project.project_manager_user != user:
-        frappe.throw(_("You can only modify entries for your managed projects"))
+    # Validate approver against the cached set of approvable projects
+    if not can_approve(doc.project, user):
+        frappe.throw(_("You can only modify entries for projects you manage or approve"))
     
     # Validate hour distribution
     total = flt(billable_hours) + flt(non_billable_hours)
     if abs(total - flt(doc.hours)) > 0.01:
         frappe.throw(_("Billable Hours + Non-Billable Hours must equal Total Hours"))
     
+    old_billable = flt(doc.billable_hours)
     doc.billable_hours = flt(billable_hours)
     doc.non_billable_hours = flt(non_billable_hours)
     doc.save()
+    record_entry_change(doc)
+    
+    deltas = {}
+    add_approved_hours_delta(deltas, doc, old_billable)
+    apply_consumed_hours_deltas(deltas)
     
     return "Hours updated successfully"
 
@@ -49,32 +59,67 @@ def update_timesheet_hours(timesheet_detail, billable_hours, non_billable_hours)
 def bulk_update_hours(timesheet_details, billable_hours_dict):
     """Bulk update hours for multiple timesheet details"""
     user = frappe.session.user
+    billable_hours_dict = frappe.parse_json(billable_hours_dict)
+    
+    # Large batches run in the background so the request does not time out
+    if len(billable_hours_dict) > BACKGROUND_JOB_THRESHOLD:
+        return enqueue_background_job("hours", billable_hours_dict)
+    
     updated_count = 0
+    deltas = {}
     
     for detail_name, hours_data in billable_hours_dict.items():
-        try:
-            doc = frappe.get_doc("Timesheet Detail", detail_name)
-            
-            # Validate project manager
-            project = frappe.get_doc("Project", doc.project)
-            if project.project_manager_user != user:
-                continue
-            
-            # Validate hour distribution
-            total = flt(hours_data.get("billable_hours", 0)) + flt(hours_data.get("non_billable_hours", 0))
-            if abs(total - flt(doc.hours)) > 0.01:
-                continue
-            
-            doc.billable_hours = flt(hours_data.get("billable_hours", 0))
-            doc.non_billable_hours = flt(hours_data.get("non_billable_hours", 0))
-            doc.save()
-            
+        if apply_hour_update(detail_name, hours_data, user, deltas) == "updated":
             updated_count += 1
-            
-        except Exception as e:
-            frappe.log_error(f"Error updating timesheet detail {detail_name}: {str(e)}")
+    
+    apply_consumed_hours_deltas(deltas)
     
     return {
         "message": f"Successfully updated {updated_count} timesheet entries",
         "updated_count": updated_count
-    }
\ No newline at end of file
+    }
+
+def apply_hour_update(detail_name, hours_data, user, deltas=None):
+    """Update hours of a single timesheet detail and return the per-entry result
+    
+    Changes to already approved billable hours are added per project to deltas when given.
+    """
+    try:
+        doc = frappe.get_doc("Timesheet Detail", detail_name, for_update=True)
+        
+        # Checked against the in-memory set of approvable projects
+        if not can_approve(doc.project, user):
+            return "skipped: not your project"
+        
+        # Validate hour distribution
+        total = flt(hours_data.get("billable_hours", 0)) + flt(hours_data.get("non_billable_hours", 0))
+        if abs(total - flt(doc.hours)) > 0.01:
+            return "skipped: hours do not add up"
+        
+        old_billable = flt(doc.billable_hours)
+        doc.billable_hours = flt(hours_data.get("billable_hours", 0))
+        doc.non_billable_hours = flt(hours_data.get("non_billable_hours", 0))
+        doc.save()
+        record_entry_change(doc)
+        
+        if deltas is not None:
+            add_approved_hours_delta(deltas, doc, old_billable)
+        
+        return "updated"
+        
+    except Exception as e:
+        frappe.log_error(f"Error updating timesheet detail {detail_name}: {str(e)}")
+        return f"error: {str(e)}"
+
+def add_approved_hours_delta(deltas, doc, old_billable):
+    """Record the consumed-hours change of an hour edit (0 unless the entry is approved)"""
+    if not doc.project:
+        return
+    
+    deltas.setdefault(doc.project, 0)
+    delta = flt(doc.billable_hours) - flt(old_billable)
+    if not delta or not doc.approved_by:
+        return
+    
+    if frappe.db.get_value("Timesheet", doc.parent, "status") == "Submitted":
+        deltas[doc.project] += delta
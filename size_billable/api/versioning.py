@@ -0,0 +1,97 @@
+import hashlib
+import json
+import pickle
+
+import frappe
+from size_billable.api.burndown import clear_burndown_cache
+
+PROJECT_VERSION_KEY = "size_billable:project_version"
+
+def invalidate_project_billing(project_names):
+    """Bump the billing version of projects and drop their cached data once the transaction commits"""
+    projects = {name for name in project_names if name}
+    if not projects:
+        return
+
+    # Collect projects for the whole transaction and flush them in a single after-commit callback,
+    # so readers never cache pre-commit data under the new version
+    pending = frappe.flags.get("size_billable_pending_invalidation")
+    if pending is None:
+        pending = frappe.flags.size_billable_pending_invalidation = set()
+        frappe.db.after_commit.add(flush_pending_invalidation)
+        frappe.db.after_rollback.add(discard_pending_invalidation)
+    pending.update(projects)
+
+def flush_pending_invalidation():
+    projects = frappe.flags.pop("size_billable_pending_invalidation", None) or set()
+    if not projects:
+        return
+
+    cache = frappe.cache()
+    for project_name in projects:
+        cache.hset(PROJECT_VERSION_KEY, project_name, frappe.generate_hash(length=10))
+    clear_burndown_cache(projects)
+
+def discard_pending_invalidation():
+    frappe.flags.pop("size_billable_pending_invalidation", None)
+
+def get_project_versions(project_names):
+    """Get the current version of each project, creating one for projects not seen yet
+
+    Reads every version in one HMGET and creates the missing ones in one pipeline. Values are
+    pickled like frappe.cache().hset stores them, so both paths read each other's versions.
+    """
+    project_names = list(project_names)
+    if not project_names:
+        return {}
+
+    cache = frappe.cache()
+    key = cache.make_key(PROJECT_VERSION_KEY)
+    versions = {}
+    missing = {}
+    for project_name, value in zip(project_names, cache.hmget(key, project_names), strict=True):
+        if value:
+            versions[project_name] = pickle.loads(value)
+        else:
+            missing[project_name] = frappe.generate_hash(length=10)
+
+    if missing:
+        # HSETNX keeps a version set concurrently; those are read back instead of our new one
+        pipeline = cache.pipeline()
+        for project_name, version in missing.items():
+            pipeline.hsetnx(key, project_name, pickle.dumps(version))
+        created = pipeline.execute()
+
+        lost = [name for name, was_set in zip(missing, created, strict=True) if not was_set]
+        if lost:
+            for project_name, value in zip(lost, cache.hmget(key, lost), strict=True):
+                missing[project_name] = pickle.loads(value) if value else missing[project_name]
+        versions.update(missing)
+
+    return versions
+
+def get_version_token(scope, project_names, *args):
+    """Build a cheap token that changes whenever any of the caller's projects or the arguments change"""
+    versions = get_project_versions(sorted(set(project_names)))
+    payload = json.dumps([scope, args, sorted(versions.items())], default=str)
+    return hashlib.md5(payload.encode()).hexdigest()
+
+def conditional_response(client_version, token, compute):
+    """Return "not modified" when the client's token is current, otherwise the versioned result of compute()"""
+    if client_version == token:
+        return {"not_modified": 1, "version": token}
+    return {"version": token, "data": compute()}
+
+def get_customer_version_token(scope, *args, customer_name=None):
+    """Version token over every project of a customer, by default the current user's"""
+    customer_name = customer_name or frappe.get_value("User", frappe.session.user, "customer")
+    projects = frappe.get_all("Project", filters={"customer": customer_name}, pluck="name") if customer_name else []
+    return get_version_token(scope, projects, customer_name, *args)
+
+def get_manager_version_token(scope, *args):
+    """Version token over every project the current user manages or approves"""
+    from size_billable.api.approvers import get_approvable_projects
+
+    user = frappe.session.user
+    projects = get_approvable_projects(user)
+    return get_version_token(scope, projects, user, *args)
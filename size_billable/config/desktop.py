@@ -20,6 +20,20 @@ def get_data():
                     "description": _("Overview of project billing and hour consumption"),
                     "onboard": 1,
                 },
+                {
+                    "type": "report",
+                    "name": "Employee Utilization Report",
+                    "label": _("Employee Utilization Report"),
+                    "description": _("Billable share, utilization and approval rates per employee"),
+                    "onboard": 1,
+                },
+                {
+                    "type": "report",
+                    "name": "Approval Latency Report",
+                    "label": _("Approval Latency Report"),
+                    "description": _("Time to approve and oldest pending entries per approver and project"),
+                    "onboard": 1,
+                },
                 {
                     "type": "page",
                     "name": "customer-portal",
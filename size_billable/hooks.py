@@ -9,7 +9,11 @@ app_color = "blue"
 app_email = "support@yourcompany.com"
 app_license = "MIT"
 
-# Custom fields configuration
+# Installation
+after_install = "size_billable.install.after_install"
+after_migrate = "size_billable.install.after_migrate"
+
+# Custom fields configuration (synced by size_billable.install.sync_custom_fields)
 custom_fields = {
     "Project": [
         {
@@ -53,6 +57,33 @@ custom_fields = {
             "insert_after": "total_purchased_hours",
             "description": "Rate per hour for billing (for Hourly Billing projects)"
         },
+        {
+            "fieldname": "budget_alert_thresholds",
+            "fieldtype": "Data",
+            "label": "Budget Alert Thresholds (%)",
+            "default": "75, 90, 100",
+            "insert_after": "hourly_rate",
+            "description": "Comma separated consumption percentages that trigger a budget alert"
+        },
+        {
+            "fieldname": "budget_alert_level",
+            "fieldtype": "Float",
+            "label": "Last Budget Alert (%)",
+            "read_only": 1,
+            "no_copy": 1,
+            "insert_after": "budget_alert_thresholds",
+            "description": "Highest budget alert threshold reached by consumed hours"
+        },
+        {
+            "fieldname": "over_budget",
+            "fieldtype": "Check",
+            "label": "Over Budget",
+            "read_only": 1,
+            "no_copy": 1,
+            "search_index": 1,
+            "insert_after": "budget_alert_level",
+            "description": "Set when consumed hours exceed purchased hours"
+        },
         {
             "fieldname": "billing_section",
             "fieldtype": "Section Break",
@@ -109,8 +140,45 @@ custom_fields = {
             "label": "Approval Status",
             "default": "Pending",
             "read_only": 1,
+            "search_index": 1,
             "insert_after": "approved_on",
             "description": "Current approval status of this timesheet entry"
+        },
+        {
+            "fieldname": "billing_period_closed",
+            "fieldtype": "Check",
+            "label": "Billing Period Closed",
+            "read_only": 1,
+            "no_copy": 1,
+            "insert_after": "approval_status",
+            "description": "Set when the entry's billing month is closed; closed entries cannot be edited"
+        },
+        {
+            "fieldname": "billing_rate",
+            "fieldtype": "Currency",
+            "label": "Billing Rate",
+            "read_only": 1,
+            "no_copy": 1,
+            "insert_after": "billing_period_closed",
+            "description": "Hourly rate resolved from the rate cards when the entry was approved"
+        },
+        {
+            "fieldname": "billing_amount",
+            "fieldtype": "Currency",
+            "label": "Billing Amount",
+            "read_only": 1,
+            "no_copy": 1,
+            "insert_after": "billing_rate",
+            "description": "Billable hours multiplied by the billing rate (approved entries only)"
+        },
+        {
+            "fieldname": "submitted_on",
+            "fieldtype": "Datetime",
+            "label": "Submitted On",
+            "read_only": 1,
+            "no_copy": 1,
+            "insert_after": "approval_status",
+            "description": "Timestamp when the entry entered the approval queue"
         }
     ]
 }
@@ -118,8 +186,15 @@ custom_fields = {
 # DocType Events
 doc_events = {
     "Project": {
-        "validate": "size_billable.api.project.validate_project_manager",
-        "on_update": "size_billable.api.project.update_project_hours"
+        "validate": [
+            "size_billable.api.project.validate_project_manager",
+            "size_billable.api.budget_alerts.validate_budget_alert_thresholds"
+        ],
+        "on_update": [
+            "size_billable.api.project.update_project_hours",
+            "size_billable.api.approvers.clear_project_manager_cache"
+        ],
+        "on_trash": "size_billable.api.approvers.clear_project_manager_cache"
     },
     "Timesheet": {
         "validate": "size_billable.api.timesheet.calculate_billable_hours",
@@ -127,14 +202,39 @@ doc_events = {
         "on_cancel": "size_billable.api.timesheet.unlock_timesheet_entries"
     },
     "Timesheet Detail": {
-        "validate": "size_billable.api.timesheet_detail.validate_hour_distribution",
-        "on_update": "size_billable.api.timesheet_detail.update_approval_status"
+        "validate": [
+            "size_billable.api.timesheet_detail.validate_hour_distribution",
+            "size_billable.api.billing_period.validate_billing_period_open",
+            "size_billable.api.rate_cards.set_billing_amount"
+        ],
+        "on_update": [
+            "size_billable.api.timesheet_detail.update_approval_status",
+            "size_billable.api.search.update_search_entry"
+        ]
     },
     "Task": {
-        "validate": "size_billable.api.task.validate_task_creation"
+        "validate": "size_billable.api.task.validate_task_creation",
+        "on_update": "size_billable.api.search.update_task_entries"
+    },
+    "Sales Invoice": {
+        "on_cancel": "size_billable.api.invoicing.release_invoiced_entries",
+        "on_trash": "size_billable.api.invoicing.release_invoiced_entries"
     }
 }
 
+# Permissions: manager and customer access rules applied in SQL and per document
+permission_query_conditions = {
+    "Project": "size_billable.api.permissions.get_project_conditions",
+    "Timesheet": "size_billable.api.permissions.get_timesheet_conditions",
+    "Timesheet Detail": "size_billable.api.permissions.get_timesheet_detail_conditions"
+}
+
+has_permission = {
+    "Project": "size_billable.api.permissions.has_project_permission",
+    "Timesheet": "size_billable.api.permissions.has_timesheet_permission",
+    "Timesheet Detail": "size_billable.api.permissions.has_timesheet_detail_permission"
+}
+
 # Client Scripts
 app_include_js = [
     "size_billable/public/js/project.js",
@@ -142,6 +242,10 @@ app_include_js = [
     "size_billable/public/js/timesheet_approval_report.js"
 ]
 
+doctype_list_js = {
+    "Timesheet": "public/js/timesheet_list.js"
+}
+
 # Reports
 report_data = [
     {
@@ -157,6 +261,20 @@ report_data = [
         "report_name": "Project Billing Summary",
         "module": "Size Billable",
         "is_standard": "No"
+    },
+    {
+        "doctype": "Report",
+        "name": "Employee Utilization Report",
+        "report_name": "Employee Utilization Report",
+        "module": "Size Billable",
+        "is_standard": "No"
+    },
+    {
+        "doctype": "Report",
+        "name": "Approval Latency Report",
+        "report_name": "Approval Latency Report",
+        "module": "Size Billable",
+        "is_standard": "No"
     }
 ]
 
@@ -168,11 +286,22 @@ website_route_rules = [
 
 # Scheduled tasks
 scheduler_events = {
+    "cron": {
+        "* * * * *": [
+            "size_billable.api.replica.write_replica_heartbeat"
+        ]
+    },
+    "hourly": [
+        "size_billable.api.budget_alerts.send_budget_alert_digests"
+    ],
     "daily": [
         "size_billable.api.scheduler.update_project_hours_daily"
     ],
     "weekly": [
         "size_billable.api.scheduler.generate_billing_reports"
+    ],
+    "monthly": [
+        "size_billable.api.archival.archive_cold_timesheet_details"
     ]
 }
 
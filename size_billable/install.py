@@ -0,0 +1,67 @@
+import frappe
+from frappe.utils import cstr
+
+def after_install():
+    sync_custom_fields()
+    ensure_roles()
+
+def after_migrate():
+    sync_custom_fields()
+
+def sync_custom_fields():
+    """Bring Custom Fields in line with hooks.custom_fields, the single declaration of the app's fields
+
+    Existing fields are read in one query and only missing or changed fields are written.
+    Schema updates and cache clears run once per affected doctype instead of once per field.
+    Returns the doctypes that changed.
+    """
+    from size_billable.hooks import custom_fields
+
+    declared = {
+        (doctype, field["fieldname"]): field
+        for doctype, fields in custom_fields.items()
+        for field in fields
+    }
+    existing = {
+        (row.dt, row.fieldname): row
+        for row in frappe.get_all("Custom Field",
+            filters={"dt": ["in", list(custom_fields)]},
+            fields=["*"]
+        )
+    }
+
+    changed_doctypes = set()
+    frappe.flags.in_create_custom_fields = True
+    try:
+        for (doctype, fieldname), field in declared.items():
+            current = existing.get((doctype, fieldname))
+
+            if not current:
+                frappe.get_doc({"doctype": "Custom Field", "dt": doctype, **field}).insert(ignore_permissions=True)
+                changed_doctypes.add(doctype)
+                continue
+
+            changes = {key: value for key, value in field.items() if cstr(current.get(key)) != cstr(value)}
+            if changes:
+                custom_field = frappe.get_doc("Custom Field", current.name)
+                custom_field.update(changes)
+                custom_field.save(ignore_permissions=True)
+                changed_doctypes.add(doctype)
+    finally:
+        frappe.flags.in_create_custom_fields = False
+
+    for doctype in sorted(changed_doctypes):
+        frappe.clear_cache(doctype=doctype)
+        frappe.db.updatedb(doctype)
+
+    return sorted(changed_doctypes)
+
+def ensure_roles():
+    # Create Project Manager role if it doesn't exist
+    if not frappe.db.exists("Role", "Project Manager"):
+        frappe.get_doc({
+            "doctype": "Role",
+            "role_name": "Project Manager",
+            "desk_access": 1,
+            "is_custom": 1
+        }).insert(ignore_permissions=True)
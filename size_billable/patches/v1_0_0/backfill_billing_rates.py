@@ -0,0 +1,5 @@
+from size_billable.api.rate_cards import backfill_billing_rates
+
+def execute():
+    """Store rates and amounts on entries approved before rate cards, so billing never reads 0 for them"""
+    backfill_billing_rates()
@@ -0,0 +1,33 @@
+import frappe
+from frappe.utils import flt
+from size_billable.api.budget_alerts import parse_thresholds
+from size_billable.install import sync_custom_fields
+
+def execute():
+    """Set over_budget and budget_alert_level of existing projects from their current consumption
+
+    Without it, projects already past a threshold alert again on their next approval.
+    """
+    # Custom fields are otherwise only synced after the patches ran
+    sync_custom_fields()
+
+    projects = frappe.get_all("Project",
+        fields=["name", "billing_type", "total_purchased_hours", "total_consumed_hours", "budget_alert_thresholds"]
+    )
+
+    for project in projects:
+        reached = 0
+        over_budget = 0
+        purchased = flt(project.total_purchased_hours)
+        if project.billing_type == "Hourly Billing" and purchased:
+            consumption_percentage = flt(project.total_consumed_hours) / purchased * 100
+            reached = max([t for t in parse_thresholds(project.budget_alert_thresholds)
+                           if consumption_percentage >= t], default=0)
+            over_budget = 1 if flt(project.total_consumed_hours) > purchased else 0
+
+        frappe.db.set_value("Project", project.name, {
+            "budget_alert_level": reached,
+            "over_budget": over_budget
+        }, update_modified=False)
+
+    frappe.db.commit()
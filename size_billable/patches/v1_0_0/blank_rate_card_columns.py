@@ -0,0 +1,13 @@
+import frappe
+from size_billable.size_billable.doctype.billing_rate_card.billing_rate_card import BLANKABLE_FIELDS
+
+def execute():
+    """Store blank project, activity type and designation of rate cards as '' for indexed lookups"""
+    for fieldname in BLANKABLE_FIELDS:
+        frappe.db.sql(f"""
+            UPDATE `tabBilling Rate Card`
+            SET `{fieldname}` = ''
+            WHERE `{fieldname}` IS NULL
+        """)
+
+    frappe.db.commit()
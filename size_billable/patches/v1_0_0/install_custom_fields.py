@@ -1,151 +1,12 @@
 import frappe
+from size_billable.install import sync_custom_fields, ensure_roles
 
 def execute():
-    """Install custom fields for Size Billable app"""
-    
-    # Install Project custom fields
-    project_fields = [
-        {
-            "dt": "Project",
-            "fieldname": "billing_type",
-            "fieldtype": "Select",
-            "options": "Fixed Cost\nHourly Billing",
-            "label": "Billing Type",
-            "reqd": 1,
-            "default": "Hourly Billing",
-            "insert_after": "project_type",
-            "description": "Defines how this project will be billed to the customer"
-        },
-        {
-            "dt": "Project",
-            "fieldname": "total_purchased_hours",
-            "fieldtype": "Float",
-            "label": "Total Purchased Hours",
-            "insert_after": "estimated_costing",
-            "description": "Total hours purchased by customer (for Hourly Billing projects)"
-        },
-        {
-            "dt": "Project",
-            "fieldname": "total_consumed_hours",
-            "fieldtype": "Float",
-            "label": "Total Consumed Hours",
-            "read_only": 1,
-            "insert_after": "total_purchased_hours",
-            "description": "Auto-calculated total of approved billable hours"
-        },
-        {
-            "dt": "Project",
-            "fieldname": "project_manager_user",
-            "fieldtype": "Link",
-            "options": "User",
-            "label": "Project Manager",
-            "reqd": 1,
-            "insert_after": "customer",
-            "description": "User responsible for managing this project and approving timesheets"
-        },
-        {
-            "dt": "Project",
-            "fieldname": "hourly_rate",
-            "fieldtype": "Currency",
-            "label": "Hourly Rate",
-            "insert_after": "total_purchased_hours",
-            "description": "Rate per hour for billing (for Hourly Billing projects)"
-        },
-        {
-            "dt": "Project",
-            "fieldname": "billing_section",
-            "fieldtype": "Section Break",
-            "label": "Billing Configuration",
-            "insert_after": "project_manager_user",
-            "collapsible": 1
-        }
-    ]
-    
-    for field in project_fields:
-        if not frappe.db.exists("Custom Field", {"dt": field["dt"], "fieldname": field["fieldname"]}):
-            frappe.get_doc({
-                "doctype": "Custom Field",
-                **field
-            }).insert()
-    
-    # Install Timesheet Detail custom fields
-    timesheet_fields = [
-        {
-            "dt": "Timesheet Detail",
-            "fieldname": "billable_hours",
-            "fieldtype": "Float",
-            "label": "Billable Hours",
-            "default": 0,
-            "insert_after": "hours",
-            "description": "Hours that can be billed to customer"
-        },
-        {
-            "dt": "Timesheet Detail",
-            "fieldname": "non_billable_hours",
-            "fieldtype": "Float",
-            "label": "Non-Billable Hours",
-            "read_only": 1,
-            "insert_after": "billable_hours",
-            "description": "Hours for internal/unbillable work (auto-calculated)"
-        },
-        {
-            "dt": "Timesheet Detail",
-            "fieldname": "approval_section",
-            "fieldtype": "Section Break",
-            "label": "Approval Details",
-            "insert_after": "non_billable_hours",
-            "collapsible": 1
-        },
-        {
-            "dt": "Timesheet Detail",
-            "fieldname": "approved_by",
-            "fieldtype": "Link",
-            "options": "User",
-            "label": "Approved By",
-            "read_only": 1,
-            "insert_after": "approval_section",
-            "description": "Project Manager who approved this entry"
-        },
-        {
-            "dt": "Timesheet Detail",
-            "fieldname": "approved_on",
-            "fieldtype": "Datetime",
-            "label": "Approved On",
-            "read_only": 1,
-            "insert_after": "approved_by",
-            "description": "Timestamp when this entry was approved"
-        },
-        {
-            "dt": "Timesheet Detail",
-            "fieldname": "approval_status",
-            "fieldtype": "Select",
-            "options": "Pending\nApproved\nRejected",
-            "label": "Approval Status",
-            "default": "Pending",
-            "read_only": 1,
-            "insert_after": "approved_on",
-            "description": "Current approval status of this timesheet entry"
-        }
-    ]
-    
-    for field in timesheet_fields:
-        if not frappe.db.exists("Custom Field", {"dt": field["dt"], "fieldname": field["fieldname"]}):
-            frappe.get_doc({
-                "doctype": "Custom Field",
-                **field
-            }).insert()
-    
-    # Create Project Manager role if it doesn't exist
-    if not frappe.db.exists("Role", "Project Manager"):
-        frappe.get_doc({
-            "doctype": "Role",
-            "role_name": "Project Manager",
-            "desk_access": 1,
-            "is_custom": 1
-        }).insert()
+    """Install custom fields for Size Billable app (declared in hooks.custom_fields)"""
+    sync_custom_fields()
+    ensure_roles()
     
     frappe.db.commit()
-    frappe.clear_cache()
 
 def before_uninstall():
     """Clean up custom fields before uninstalling"""
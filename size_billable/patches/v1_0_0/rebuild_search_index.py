@@ -0,0 +1,5 @@
+from size_billable.api.search import rebuild_search_index
+
+def execute():
+    """Index the entries approved before portal search existed"""
+    rebuild_search_index()
@@ -118,6 +118,9 @@ function show_hour_consumption_chart(project) {
                                             <td><strong>${data.consumption_percentage.toFixed(1)}%</strong></td>
                                         </tr>
                                     </table>
+                                    <small class="text-muted">
+                                        ${__("Computed {0}", [frappe.datetime.comment_when(data.computed_at)])}
+                                    </small>
                                 </div>
                             </div>
                         </div>
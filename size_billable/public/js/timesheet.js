@@ -21,6 +21,18 @@ frappe.ui.form.on("Timesheet", {
             frm.add_custom_button(__("Approval Status"), function () {
                 show_approval_status(frm.doc);
             }, __("Size Billable"));
+
+            // Counts only; entry rows are fetched when the dialog is opened
+            frappe.call({
+                method: "size_billable.api.timesheet.get_timesheets_approval_status",
+                args: { "timesheet_names": [frm.doc.name] },
+                callback: function (r) {
+                    const counts = r.message && r.message[frm.doc.name];
+                    if (counts) {
+                        frm.dashboard.set_headline(get_approval_headline(counts));
+                    }
+                }
+            });
         }
     }
 });
@@ -140,6 +152,19 @@ function show_approval_status(timesheet) {
     });
 }
 
+function get_approval_headline(counts) {
+    return `<span class="indicator ${get_approval_indicator(counts)[1]}">
+        ${__("{0} pending, {1} approved, {2} rejected of {3} entries",
+            [counts.pending_entries, counts.approved_entries, counts.rejected_entries, counts.total_entries])}
+    </span>`;
+}
+
+function get_approval_indicator(counts) {
+    if (counts.pending_entries) return [__("Pending Approval"), "orange"];
+    if (counts.rejected_entries) return [__("Partly Rejected"), "red"];
+    return [__("Approved"), "green"];
+}
+
 function getStatusBadgeClass(status) {
     switch (status) {
         case "Approved": return "bg-success";
@@ -20,6 +20,31 @@ frappe.query_reports["Timesheet Approval Report"] = {
 
         // Add event listeners for hour editing
         setup_hour_editing(report);
+
+        // Follow large approval and hour-edit batches running in the background
+        setup_background_job_progress(report);
+
+        // Patch rows in place when approvals or hour edits are pushed from the server
+        frappe.realtime.off("size_billable_billing_change");
+        frappe.realtime.on("size_billable_billing_change", function (data) {
+            apply_billing_change(report, data);
+        });
+
+        // Drill into a group of the grouped view by applying its filters and showing the detail rows
+        $(document).off("click.size_billable_drill").on("click.size_billable_drill", "a.size-billable-drill", function (e) {
+            e.preventDefault();
+            drill_into_group(report, JSON.parse($(this).attr("data-drill-filters")));
+        });
+    },
+
+    formatter: function (value, row, column, data, default_formatter) {
+        value = default_formatter(value, row, column, data);
+
+        if (column.fieldname === "group_label" && data && data.drill_filters) {
+            value = `<a class="size-billable-drill" href="#" data-drill-filters="${frappe.utils.escape_html(JSON.stringify(data.drill_filters))}">${value}</a>`;
+        }
+
+        return value;
     },
 
     onload_view: function (report) {
@@ -106,9 +131,13 @@ function bulk_approve_entries(report) {
                     action: "approve"
                 },
                 callback: function (r) {
-                    if (r.message) {
-                        frappe.msgprint(__("Successfully approved {0} entries", [r.message.approved_count]));
-                        report.refresh();
+                    if (r.message && r.message.queued) {
+                        show_background_job_queued(r.message);
+                    } else if (r.message) {
+                        frappe.show_alert({
+                            message: __("Successfully approved {0} entries", [r.message.approved_count]),
+                            indicator: "green"
+                        });
                     }
                 }
             });
@@ -138,9 +167,13 @@ function bulk_reject_entries(report) {
                     action: "reject"
                 },
                 callback: function (r) {
-                    if (r.message) {
-                        frappe.msgprint(__("Successfully rejected {0} entries", [r.message.approved_count]));
-                        report.refresh();
+                    if (r.message && r.message.queued) {
+                        show_background_job_queued(r.message);
+                    } else if (r.message) {
+                        frappe.show_alert({
+                            message: __("Successfully rejected {0} entries", [timesheet_details.length]),
+                            indicator: "orange"
+                        });
                     }
                 }
             });
@@ -181,18 +214,133 @@ function save_hour_changes(report) {
             billable_hours_dict: hour_updates
         },
         callback: function (r) {
-            if (r.message) {
-                frappe.msgprint(__("Successfully updated {0} entries", [r.message.updated_count]));
+            if (r.message && r.message.queued) {
+                show_background_job_queued(r.message);
+                changed_rows.forEach(row => {
+                    row.removeClass('table-warning');
+                });
+            } else if (r.message) {
+                frappe.show_alert({
+                    message: __("Successfully updated {0} entries", [r.message.updated_count]),
+                    indicator: "green"
+                });
                 // Remove highlighting
                 changed_rows.forEach(row => {
                     row.removeClass('table-warning');
                 });
-                report.refresh();
             }
         }
     });
 }
 
+function show_background_job_queued(job) {
+    frappe.show_alert({
+        message: __("{0} entries queued for background processing", [job.total]),
+        indicator: "blue"
+    });
+    frappe.show_progress(__("Processing Entries"), 0, job.total, __("Queued"));
+}
+
+function setup_background_job_progress(report) {
+    frappe.realtime.off("size_billable_job_progress");
+    frappe.realtime.on("size_billable_job_progress", function (data) {
+        frappe.show_progress(__("Processing Entries"), data.processed, data.total,
+            __("{0} of {1} entries processed", [data.processed, data.total]));
+
+        if (data.status === "Completed" || data.status === "Failed") {
+            frappe.hide_progress();
+            show_background_job_result(report, data.job_id);
+        }
+    });
+}
+
+function show_background_job_result(report, job_id) {
+    frappe.call({
+        method: "size_billable.api.approval_jobs.get_background_job_result",
+        args: { job_id: job_id },
+        callback: function (r) {
+            if (!r.message) {
+                return;
+            }
+
+            const job = r.message;
+            const summary = Object.keys(job.summary)
+                .map(key => `${key}: ${job.summary[key]}`)
+                .join("<br>");
+
+            if (job.status === "Failed") {
+                frappe.confirm(
+                    __("Background job failed after {0} of {1} entries: {2}<br>{3}<br>Resume it?",
+                        [job.processed, job.total, job.error, summary]),
+                    function () {
+                        frappe.call({
+                            method: "size_billable.api.approval_jobs.resume_background_job",
+                            args: { job_id: job_id }
+                        });
+                    }
+                );
+            } else {
+                frappe.msgprint(__("Background job completed for {0} entries<br>{1}", [job.total, summary]));
+            }
+        }
+    });
+}
+
+function drill_into_group(report, drill_filters) {
+    // Clearing group_by switches the report back to detail rows for just this group
+    report.set_filter_value(Object.assign({ group_by: "" }, drill_filters));
+}
+
+function apply_billing_change(report, data) {
+    // Rows arrive through realtime after commit, so the report never has to re-run get_data
+    if (!report.data || !report.datatable || !data.entries || data.entries.length === 0) {
+        return;
+    }
+
+    // Grouped rows are aggregates; they are brought up to date with Refresh Data
+    if ((report.get_filter_values() || {}).group_by) {
+        return;
+    }
+
+    const changes = {};
+    data.entries.forEach(entry => {
+        changes[entry.name] = entry;
+    });
+
+    const status_filter = (report.get_filter_values() || {}).status;
+    let touched = false;
+    const rows = [];
+
+    report.data.forEach(row => {
+        const change = changes[row.name];
+        if (!change) {
+            rows.push(row);
+            return;
+        }
+
+        touched = true;
+        // Drop rows that no longer match the status filter (e.g. approved while viewing Pending)
+        if (status_filter && change.approval_status !== status_filter) {
+            return;
+        }
+
+        Object.assign(row, {
+            checkbox: 0,
+            billable_hours: change.billable_hours,
+            non_billable_hours: change.non_billable_hours,
+            approval_status: change.approval_status,
+            approved_by: change.approved_by,
+            approved_on: change.approved_on ? frappe.datetime.str_to_user(change.approved_on.replace("T", " ")) : null
+        });
+        rows.push(row);
+    });
+
+    if (touched) {
+        report.data = rows;
+        report.datatable.refresh(rows);
+    }
+}
+
 function get_selected_rows(report) {
     const selected_rows = [];
     report.wrapper.find('input[data-fieldname="checkbox"]:checked').each(function () {
@@ -0,0 +1,49 @@
+// Approval status indicators for submitted timesheets, fetched for the whole page in one call
+frappe.listview_settings["Timesheet"] = frappe.listview_settings["Timesheet"] || {};
+
+(function (settings) {
+    const base_refresh = settings.refresh;
+
+    settings.refresh = function (listview) {
+        if (base_refresh) {
+            base_refresh.call(this, listview);
+        }
+
+        const names = (listview.data || [])
+            .filter(doc => doc.docstatus === 1)
+            .map(doc => doc.name);
+        if (!names.length) return;
+
+        frappe.call({
+            method: "size_billable.api.timesheet.get_timesheets_approval_status",
+            args: { "timesheet_names": names },
+            callback: function (r) {
+                Object.entries(r.message || {}).forEach(([name, counts]) => {
+                    const $row = listview.$result
+                        .find(`.list-row-checkbox[data-name="${CSS.escape(name)}"]`)
+                        .closest(".list-row");
+                    const [label, color] = get_list_approval_indicator(counts);
+
+                    $row.find(".size-billable-approval").remove();
+                    $row.find(".level-right").prepend(`
+                        <span class="size-billable-approval indicator-pill ${color} mr-2"
+                            title="${__("{0} pending, {1} approved, {2} rejected",
+                                [counts.pending_entries, counts.approved_entries, counts.rejected_entries])}">
+                            ${label}
+                        </span>
+                    `);
+                });
+            }
+        });
+    };
+})(frappe.listview_settings["Timesheet"]);
+
+function get_list_approval_indicator(counts) {
+    if (counts.pending_entries) {
+        return [__("{0} Pending", [counts.pending_entries]), "orange"];
+    }
+    if (counts.rejected_entries) {
+        return [__("{0} Rejected", [counts.rejected_entries]), "red"];
+    }
+    return [__("Approved"), "green"];
+}
@@ -0,0 +1,188 @@
+import frappe
+from frappe import _
+from frappe.utils import flt
+from size_billable.api.replica import replica_read
+from size_billable.api.approvers import get_approvable_projects
+from size_billable.api.approval_latency import (
+    get_latency_stats, get_pending_queue, merge_histograms, get_percentile, get_age_hours
+)
+
+# Group option -> row key fields
+GROUP_BY_FIELDS = {
+    "Approver": ("approver",),
+    "Project": ("project",),
+    "Approver and Project": ("approver", "project")
+}
+
+@replica_read("report")
+def execute(filters=None):
+    filters = filters or {}
+    columns = get_columns(filters)
+    data = get_data(filters)
+    return columns, data
+
+def get_columns(filters):
+    group_fields = GROUP_BY_FIELDS.get(filters.get("group_by") or "Approver", ())
+    columns = []
+
+    if "approver" in group_fields:
+        columns.append({
+            "fieldname": "approver", 
+            "label": "Approver", 
+            "fieldtype": "Link", 
+            "options": "User",
+            "width": 180
+        })
+    if "project" in group_fields:
+        columns.append({
+            "fieldname": "project", 
+            "label": "Project", 
+            "fieldtype": "Link", 
+            "options": "Project",
+            "width": 150
+        })
+
+    return [
+        *columns,
+        {
+            "fieldname": "pending_count", 
+            "label": "Pending", 
+            "fieldtype": "Int", 
+            "width": 80
+        },
+        {
+            "fieldname": "oldest_pending_on", 
+            "label": "Oldest Pending Since", 
+            "fieldtype": "Datetime", 
+            "width": 150
+        },
+        {
+            "fieldname": "oldest_pending_hours", 
+            "label": "Oldest Pending (Hours)", 
+            "fieldtype": "Float", 
+            "width": 140
+        },
+        {
+            "fieldname": "approved_count", 
+            "label": "Approved", 
+            "fieldtype": "Int", 
+            "width": 80
+        },
+        {
+            "fieldname": "avg_hours", 
+            "label": "Average Hours to Approve", 
+            "fieldtype": "Float", 
+            "width": 150
+        },
+        {
+            "fieldname": "p50_hours", 
+            "label": "p50 Hours to Approve", 
+            "fieldtype": "Float", 
+            "width": 130
+        },
+        {
+            "fieldname": "p90_hours", 
+            "label": "p90 Hours to Approve", 
+            "fieldtype": "Float", 
+            "width": 130
+        },
+        {
+            "fieldname": "max_hours", 
+            "label": "Longest Hours to Approve", 
+            "fieldtype": "Float", 
+            "width": 150
+        }
+    ]
+
+def get_data(filters):
+    group_by = filters.get("group_by") or "Approver"
+    if group_by not in GROUP_BY_FIELDS:
+        frappe.throw(_("Invalid group {0}").format(group_by))
+    group_fields = GROUP_BY_FIELDS[group_by]
+
+    # System Managers see every project, everyone else only the projects they manage or approve
+    projects = None
+    if "System Manager" not in frappe.get_roles(frappe.session.user):
+        projects = list(get_approvable_projects(frappe.session.user))
+        if not projects:
+            return []
+
+    if filters.get("project"):
+        if projects is not None and filters.get("project") not in projects:
+            return []
+        projects = [filters.get("project")]
+
+    # Both sources are small: one statistics row per approver and project, and the pending queue
+    stats = get_latency_stats(projects)
+    pending = get_pending_queue(projects)
+
+    if filters.get("approver"):
+        stats = [row for row in stats if row.approver == filters.get("approver")]
+        pending = [row for row in pending if row.approver == filters.get("approver")]
+
+    merged = {}
+    def get_group(row):
+        key = tuple(row[field] for field in group_fields)
+        if key not in merged:
+            merged[key] = frappe._dict({
+                **dict(zip(group_fields, key, strict=True)),
+                "pending_count": 0,
+                "oldest_pending_on": None,
+                "approved_count": 0,
+                "total_hours": 0,
+                "max_hours": 0,
+                "histograms": []
+            })
+        return merged[key]
+
+    for row in stats:
+        group = get_group(row)
+        group.approved_count += row.approved_count
+        group.total_hours += flt(row.total_hours)
+        group.max_hours = max(group.max_hours, flt(row.max_hours))
+        group.histograms.append(row.histogram)
+
+    for row in pending:
+        group = get_group(row)
+        group.pending_count += row.pending_count
+        if not group.oldest_pending_on or row.oldest_pending_on < group.oldest_pending_on:
+            group.oldest_pending_on = row.oldest_pending_on
+
+    data = []
+    for group in merged.values():
+        histogram = merge_histograms(group.pop("histograms"))
+        total_hours = group.pop("total_hours")
+        group["oldest_pending_hours"] = get_age_hours(group.oldest_pending_on)
+        group["avg_hours"] = flt(total_hours / group.approved_count, 1) if group.approved_count else 0
+        group["p50_hours"] = get_percentile(histogram, 50, group.max_hours)
+        group["p90_hours"] = get_percentile(histogram, 90, group.max_hours)
+        group["max_hours"] = flt(group.max_hours, 1)
+        data.append(group)
+
+    # Bottlenecks first: the longest waiting queue, then the slowest approvals
+    data.sort(key=lambda row: (row.oldest_pending_hours, row.p90_hours), reverse=True)
+    return data
+
+def get_filters():
+    return [
+        {
+            "fieldname": "group_by",
+            "label": "Group By",
+            "fieldtype": "Select",
+            "options": "Approver\nProject\nApprover and Project",
+            "default": "Approver"
+        },
+        {
+            "fieldname": "project",
+            "label": "Project",
+            "fieldtype": "Link",
+            "options": "Project",
+            "get_query": "size_billable.api.timesheet.get_manager_projects"
+        },
+        {
+            "fieldname": "approver",
+            "label": "Approver",
+            "fieldtype": "Link",
+            "options": "User"
+        }
+    ]
@@ -0,0 +1 @@
+# Employee Utilization Report module
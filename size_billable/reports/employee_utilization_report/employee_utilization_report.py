@@ -0,0 +1,262 @@
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, nowdate, add_months, get_first_day
+from size_billable.api.replica import replica_read
+from size_billable.api.approvers import get_approvable_projects_query
+
+# Period option -> (period start expression over a {date} column, label format)
+PERIOD_FIELDS = {
+    "Weekly": ("DATE_SUB({date}, INTERVAL WEEKDAY({date}) DAY)", None),
+    "Monthly": ("DATE_FORMAT({date}, '%%Y-%%m-01')", "%Y-%m"),
+    "Quarterly": ("MAKEDATE(YEAR({date}), 1) + INTERVAL QUARTER({date}) - 1 QUARTER", None),
+    "Yearly": ("MAKEDATE(YEAR({date}), 1)", "%Y")
+}
+
+SUM_FIELDS = ("hours", "billable_hours", "non_billable_hours", "approved_billable_hours",
+    "pending_count", "approved_count", "rejected_count")
+
+# Without a from date only the last twelve months are scanned
+DEFAULT_MONTHS = 12
+
+@replica_read("report")
+def execute(filters=None):
+    filters = filters or {}
+    columns = get_columns()
+    data = get_data(filters)
+    return columns, data
+
+def get_columns():
+    return [
+        {
+            "fieldname": "period", 
+            "label": "Period", 
+            "fieldtype": "Data", 
+            "width": 90
+        },
+        {
+            "fieldname": "employee", 
+            "label": "Employee", 
+            "fieldtype": "Link", 
+            "options": "Employee",
+            "width": 110
+        },
+        {
+            "fieldname": "employee_name", 
+            "label": "Employee Name", 
+            "fieldtype": "Data", 
+            "width": 140
+        },
+        {
+            "fieldname": "projects", 
+            "label": "Projects", 
+            "fieldtype": "Int", 
+            "width": 70
+        },
+        {
+            "fieldname": "hours", 
+            "label": "Total Hours", 
+            "fieldtype": "Float", 
+            "width": 90
+        },
+        {
+            "fieldname": "billable_hours", 
+            "label": "Billable Hours", 
+            "fieldtype": "Float", 
+            "width": 100
+        },
+        {
+            "fieldname": "non_billable_hours", 
+            "label": "Non-Billable Hours", 
+            "fieldtype": "Float", 
+            "width": 120
+        },
+        {
+            "fieldname": "approved_billable_hours", 
+            "label": "Approved Billable Hours", 
+            "fieldtype": "Float", 
+            "width": 140
+        },
+        {
+            "fieldname": "billable_share", 
+            "label": "Billable Share %", 
+            "fieldtype": "Percent", 
+            "width": 110
+        },
+        {
+            "fieldname": "utilization", 
+            "label": "Utilization %", 
+            "fieldtype": "Percent", 
+            "width": 100
+        },
+        {
+            "fieldname": "pending_count", 
+            "label": "Pending", 
+            "fieldtype": "Int", 
+            "width": 80
+        },
+        {
+            "fieldname": "approval_rate", 
+            "label": "Approval Rate %", 
+            "fieldtype": "Percent", 
+            "width": 110
+        }
+    ]
+
+def get_data(filters):
+    period = filters.get("period") or "Monthly"
+    if period not in PERIOD_FIELDS:
+        frappe.throw(_("Invalid period {0}").format(period))
+
+    to_date = getdate(filters.get("to_date") or nowdate())
+    from_date = getdate(filters.get("from_date") or get_first_day(add_months(to_date, 1 - DEFAULT_MONTHS)))
+
+    conditions = """
+        WHERE ts.status = 'Submitted'
+        AND ts.start_date BETWEEN %(from_date)s AND %(to_date)s
+    """
+    archive_conditions = """
+        WHERE arc.period_start BETWEEN %(from_date)s AND %(to_date)s
+    """
+    query_params = {"from_date": from_date, "to_date": to_date}
+
+    # System Managers see every project, everyone else only the projects they manage or approve
+    if "System Manager" not in frappe.get_roles(frappe.session.user):
+        approvable_projects = get_approvable_projects_query(frappe.session.user)
+        conditions += f" AND tsd.project IN ({approvable_projects})"
+        archive_conditions += f" AND arc.project IN ({approvable_projects})"
+
+    if filters.get("project"):
+        conditions += " AND tsd.project = %(project)s"
+        archive_conditions += " AND arc.project = %(project)s"
+        query_params["project"] = filters.get("project")
+
+    if filters.get("employee"):
+        conditions += " AND ts.employee = %(employee)s"
+        archive_conditions += " AND arc.employee = %(employee)s"
+        query_params["employee"] = filters.get("employee")
+
+    period_expression, _label_format = PERIOD_FIELDS[period]
+
+    # One pass over the period's entries; all ratios are derived from the grouped sums.
+    # Rows are per project too, so live and archived history merge without double-counting projects
+    live_rows = frappe.db.sql(f"""
+        SELECT 
+            {period_expression.format(date="ts.start_date")} as period_start,
+            ts.employee,
+            MAX(ts.employee_name) as employee_name,
+            tsd.project,
+            SUM(tsd.hours) as hours,
+            SUM(tsd.billable_hours) as billable_hours,
+            SUM(tsd.non_billable_hours) as non_billable_hours,
+            SUM(IF(tsd.approval_status = 'Approved', tsd.billable_hours, 0)) as approved_billable_hours,
+            SUM(tsd.approval_status = 'Pending') as pending_count,
+            SUM(tsd.approval_status = 'Approved') as approved_count,
+            SUM(tsd.approval_status = 'Rejected') as rejected_count
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        {conditions}
+        GROUP BY period_start, ts.employee, tsd.project
+    """, query_params, as_dict=True)
+
+    # Archived months only have monthly totals, so they cannot be split into weeks
+    archived_rows = []
+    if period != "Weekly":
+        archived_rows = frappe.db.sql(f"""
+            SELECT 
+                {period_expression.format(date="arc.period_start")} as period_start,
+                arc.employee,
+                MAX(arc.employee_name) as employee_name,
+                arc.project,
+                SUM(arc.hours) as hours,
+                SUM(arc.billable_hours) as billable_hours,
+                SUM(arc.non_billable_hours) as non_billable_hours,
+                SUM(arc.approved_billable_hours) as approved_billable_hours,
+                0 as pending_count,
+                SUM(arc.approved_count) as approved_count,
+                SUM(arc.rejected_count) as rejected_count
+            FROM `tabArchived Billing Summary` arc
+            {archive_conditions}
+            GROUP BY period_start, arc.employee, arc.project
+        """, query_params, as_dict=True)
+
+    data = merge_employee_rows(live_rows + archived_rows)
+
+    for row in data:
+        row["period"] = get_period_label(period, row.pop("period_start"))
+        hours = flt(row["hours"])
+        decided = flt(row["approved_count"]) + flt(row["rejected_count"])
+
+        row["billable_share"] = flt(row["billable_hours"]) / hours * 100 if hours else 0
+        row["utilization"] = flt(row["approved_billable_hours"]) / hours * 100 if hours else 0
+        row["approval_rate"] = flt(row["approved_count"]) / decided * 100 if decided else 0
+
+    return data
+
+def merge_employee_rows(rows):
+    """Combine per-project rows into one row per period and employee"""
+    merged = {}
+    for row in rows:
+        key = (getdate(row.period_start), row.employee)
+        if key not in merged:
+            merged[key] = frappe._dict({
+                "period_start": key[0],
+                "employee": row.employee,
+                "employee_name": row.employee_name,
+                "project_set": set(),
+                **{field: 0 for field in SUM_FIELDS}
+            })
+        target = merged[key]
+        target.project_set.add(row.project)
+        for field in SUM_FIELDS:
+            target[field] += flt(row[field])
+
+    data = sorted(merged.values(), key=lambda row: row.employee_name or "")
+    data.sort(key=lambda row: row.period_start, reverse=True)
+    for row in data:
+        row["projects"] = len(row.pop("project_set"))
+    return data
+
+def get_period_label(period, period_start):
+    start = getdate(period_start)
+    label_format = PERIOD_FIELDS[period][1]
+
+    if period == "Weekly":
+        year, week, _weekday = start.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == "Quarterly":
+        return f"{start.year}-Q{(start.month - 1) // 3 + 1}"
+    return start.strftime(label_format)
+
+def get_filters():
+    return [
+        {
+            "fieldname": "period",
+            "label": "Period",
+            "fieldtype": "Select",
+            "options": "Weekly\nMonthly\nQuarterly\nYearly",
+            "default": "Monthly"
+        },
+        {
+            "fieldname": "from_date",
+            "label": "From Date",
+            "fieldtype": "Date"
+        },
+        {
+            "fieldname": "to_date",
+            "label": "To Date",
+            "fieldtype": "Date"
+        },
+        {
+            "fieldname": "project",
+            "label": "Project",
+            "fieldtype": "Link",
+            "options": "Project",
+            "get_query": "size_billable.api.timesheet.get_manager_projects"
+        },
+        {
+            "fieldname": "employee",
+            "label": "Employee",
+            "fieldtype": "Link",
+            "options": "Employee"
+        }
+    ]
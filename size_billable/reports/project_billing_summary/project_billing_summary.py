@@ -1,7 +1,11 @@
 import frappe
 from frappe import _
 from frappe.utils import flt, format_currency
+from size_billable.api.replica import replica_read
+from size_billable.api.rate_cards import get_billable_amounts
+from size_billable.api.approvers import get_approvable_projects_query
 
+@replica_read("report")
 def execute(filters=None):
     columns = get_columns()
     data = get_data(filters)
@@ -84,19 +88,8 @@ def get_columns():
     ]
 
 def get_data(filters):
-    user = frappe.session.user
-    
-    # Get projects managed by current user
-    managed_projects = frappe.get_all("Project", 
-        filters={"project_manager_user": user},
-        pluck="name"
-    )
-    
-    if not managed_projects:
-        return []
-    
     # Build query
-    query = """
+    query = f"""
         SELECT 
             p.name,
             p.project_name,
@@ -110,10 +103,11 @@ def get_data(filters):
             u.full_name as project_manager
         FROM `tabProject` p
         LEFT JOIN `tabUser` u ON p.project_manager_user = u.name
-        WHERE p.name IN %(projects)s
+        WHERE p.name IN ({get_approvable_projects_query(frappe.session.user)})
     """
     
-    query_params = {"projects": managed_projects}
+    # Only projects the current user manages or approves
+    query_params = {}
     
     # Apply filters
     if filters.get("project"):
@@ -131,6 +125,9 @@ def get_data(filters):
     query += " ORDER BY p.project_name"
     
     data = frappe.db.sql(query, query_params, as_dict=True)
+    project_names = [row["name"] for row in data]
+    billable_amounts = get_billable_amounts(project_names)
+    pending_counts = get_pending_counts(project_names)
     
     # Calculate additional fields
     for row in data:
@@ -141,22 +138,26 @@ def get_data(filters):
         else:
             row["consumption_percentage"] = 0
         
-        row["total_billable_amount"] = (row["total_consumed_hours"] or 0) * (row["hourly_rate"] or 0)
-        
-        # Get pending approvals count
-        pending_count = frappe.db.sql("""
-            SELECT COUNT(*)
-            FROM `tabTimesheet Detail` tsd
-            INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
-            WHERE tsd.project = %s
-            AND ts.status = 'Submitted'
-            AND tsd.approval_status = 'Pending'
-        """, row["name"])[0][0]
-        
-        row["pending_approvals"] = pending_count
+        row["total_billable_amount"] = billable_amounts.get(row["name"], 0)
+        row["pending_approvals"] = pending_counts.get(row["name"], 0)
     
     return data
 
+def get_pending_counts(project_names):
+    """Count pending approvals of all projects in one grouped query"""
+    if not project_names:
+        return {}
+
+    return dict(frappe.db.sql("""
+        SELECT tsd.project, COUNT(*)
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        WHERE tsd.project IN %s
+        AND ts.status = 'Submitted'
+        AND tsd.approval_status = 'Pending'
+        GROUP BY tsd.project
+    """, [project_names]))
+
 def get_filters():
     return [
         {
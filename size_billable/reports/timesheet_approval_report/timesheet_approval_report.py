@@ -1,8 +1,33 @@
 import frappe
 from frappe import _
-from frappe.utils import flt, format_datetime
+from frappe.utils import flt, format_datetime, getdate, get_last_day, add_days
+from size_billable.api.replica import replica_read
+from size_billable.api.approvers import get_approvable_projects_query
 
+# Group by option -> (group key expression, group label expression)
+GROUP_BY_FIELDS = {
+    "Employee": ("ts.employee", "MAX(ts.employee_name)"),
+    "Project": ("tsd.project", "MAX(p.project_name)"),
+    "Task": ("tsd.task", "tsd.task"),
+    "Activity Type": ("tsd.activity_type", "tsd.activity_type"),
+    "Week": ("DATE_SUB(ts.start_date, INTERVAL WEEKDAY(ts.start_date) DAY)", None),
+    "Month": ("DATE_FORMAT(ts.start_date, '%%Y-%%m-01')", None)
+}
+
+# Filter set when drilling into a group of each kind
+GROUP_BY_DRILL_FILTERS = {
+    "Employee": "employee",
+    "Project": "project",
+    "Task": "task",
+    "Activity Type": "activity_type"
+}
+
+@replica_read("report")
 def execute(filters=None):
+    filters = filters or {}
+    if filters.get("group_by"):
+        return get_group_columns(filters.get("group_by")), get_grouped_data(filters)
+
     columns = get_columns()
     data = get_data(filters)
     return columns, data
@@ -85,17 +110,92 @@ def get_columns():
         }
     ]
 
-def get_data(filters):
-    user = frappe.session.user
+def get_group_columns(group_by):
+    return [
+        {
+            "fieldname": "group_label", 
+            "label": group_by, 
+            "fieldtype": "Data", 
+            "width": 200
+        },
+        {
+            "fieldname": "entries", 
+            "label": "Entries", 
+            "fieldtype": "Int", 
+            "width": 80
+        },
+        {
+            "fieldname": "hours", 
+            "label": "Total Hours", 
+            "fieldtype": "Float", 
+            "width": 100
+        },
+        {
+            "fieldname": "billable_hours", 
+            "label": "Billable Hours", 
+            "fieldtype": "Float", 
+            "width": 100
+        },
+        {
+            "fieldname": "non_billable_hours", 
+            "label": "Non-Billable Hours", 
+            "fieldtype": "Float", 
+            "width": 120
+        },
+        {
+            "fieldname": "pending_count", 
+            "label": "Pending", 
+            "fieldtype": "Int", 
+            "width": 80
+        },
+        {
+            "fieldname": "approved_count", 
+            "label": "Approved", 
+            "fieldtype": "Int", 
+            "width": 80
+        },
+        {
+            "fieldname": "rejected_count", 
+            "label": "Rejected", 
+            "fieldtype": "Int", 
+            "width": 80
+        }
+    ]
+
+def get_conditions(filters):
+    """Build the WHERE clause shared by the detail and grouped queries"""
+    # Projects the current user manages or approves are selected by a subquery, not a parameter list
+    conditions = f"""
+        WHERE tsd.project IN ({get_approvable_projects_query(frappe.session.user)})
+        AND ts.status = 'Submitted'
+    """
+    
+    query_params = {}
+    
+    # Apply filters
+    for fieldname, column in (
+        ("project", "tsd.project"),
+        ("employee", "ts.employee"),
+        ("task", "tsd.task"),
+        ("activity_type", "tsd.activity_type"),
+        ("status", "tsd.approval_status")
+    ):
+        if filters.get(fieldname):
+            conditions += f" AND {column} = %({fieldname})s"
+            query_params[fieldname] = filters.get(fieldname)
+    
+    if filters.get("from_date"):
+        conditions += " AND ts.start_date >= %(from_date)s"
+        query_params["from_date"] = filters.get("from_date")
     
-    # Get projects managed by current user
-    managed_projects = frappe.get_all("Project", 
-        filters={"project_manager_user": user},
-        pluck="name"
-    )
+    if filters.get("to_date"):
+        conditions += " AND ts.start_date <= %(to_date)s"
+        query_params["to_date"] = filters.get("to_date")
     
-    if not managed_projects:
-        return []
+    return conditions, query_params
+
+def get_data(filters):
+    conditions, query_params = get_conditions(filters)
     
     # Build query
     query = """
@@ -121,34 +221,7 @@ def get_data(filters):
         FROM `tabTimesheet Detail` tsd
         INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
         INNER JOIN `tabProject` p ON tsd.project = p.name
-        WHERE tsd.project IN %(projects)s
-        AND ts.status = 'Submitted'
-    """
-    
-    query_params = {"projects": managed_projects}
-    
-    # Apply filters
-    if filters.get("project"):
-        query += " AND tsd.project = %(project)s"
-        query_params["project"] = filters.get("project")
-    
-    if filters.get("employee"):
-        query += " AND ts.employee = %(employee)s"
-        query_params["employee"] = filters.get("employee")
-    
-    if filters.get("status"):
-        query += " AND tsd.approval_status = %(status)s"
-        query_params["status"] = filters.get("status")
-    
-    if filters.get("from_date"):
-        query += " AND ts.start_date >= %(from_date)s"
-        query_params["from_date"] = filters.get("from_date")
-    
-    if filters.get("to_date"):
-        query += " AND ts.start_date <= %(to_date)s"
-        query_params["to_date"] = filters.get("to_date")
-    
-    query += " ORDER BY ts.start_date DESC, ts.employee_name"
+    """ + conditions + " ORDER BY ts.start_date DESC, ts.employee_name"
     
     data = frappe.db.sql(query, query_params, as_dict=True)
     
@@ -160,6 +233,69 @@ def get_data(filters):
     
     return data
 
+def get_grouped_data(filters):
+    """Aggregate the filtered entries per group in the database; each row carries the filters to drill into it"""
+    group_by = filters.get("group_by")
+    if group_by not in GROUP_BY_FIELDS:
+        frappe.throw(_("Cannot group by {0}").format(group_by))
+    
+    conditions, query_params = get_conditions(filters)
+    key_expression, label_expression = GROUP_BY_FIELDS[group_by]
+    
+    data = frappe.db.sql(f"""
+        SELECT 
+            {key_expression} as group_key,
+            {label_expression or key_expression} as group_label,
+            COUNT(*) as entries,
+            SUM(tsd.hours) as hours,
+            SUM(tsd.billable_hours) as billable_hours,
+            SUM(tsd.non_billable_hours) as non_billable_hours,
+            SUM(tsd.approval_status = 'Pending') as pending_count,
+            SUM(tsd.approval_status = 'Approved') as approved_count,
+            SUM(tsd.approval_status = 'Rejected') as rejected_count
+        FROM `tabTimesheet Detail` tsd
+        INNER JOIN `tabTimesheet` ts ON tsd.parent = ts.name
+        INNER JOIN `tabProject` p ON tsd.project = p.name
+        {conditions}
+        GROUP BY {key_expression}
+        ORDER BY {"group_key DESC" if label_expression is None else "group_label"}
+    """, query_params, as_dict=True)
+    
+    for row in data:
+        for fieldname in ("hours", "billable_hours", "non_billable_hours"):
+            row[fieldname] = flt(row[fieldname], 2)
+        row["drill_filters"] = get_drill_filters(group_by, row, filters)
+    
+    return data
+
+def get_drill_filters(group_by, row, filters):
+    """Filters that narrow the detail view to one group, keeping the current date range for non-date groups
+
+    The group of entries without a value gets none: report filters can only match a set value.
+    Date groups are clamped to the report's range, so the detail view shows what the group counted.
+    """
+    if group_by in GROUP_BY_DRILL_FILTERS:
+        row["group_label"] = row["group_label"] or _("Not Set")
+        if row["group_key"] is None:
+            return None
+        return {GROUP_BY_DRILL_FILTERS[group_by]: row["group_key"]}
+    
+    start = getdate(row["group_key"])
+    if group_by == "Week":
+        year, week, _weekday = start.isocalendar()
+        row["group_label"] = f"{year}-W{week:02d}"
+        end = add_days(start, 6)
+    else:
+        row["group_label"] = start.strftime("%Y-%m")
+        end = get_last_day(start)
+    
+    if filters.get("from_date"):
+        start = max(start, getdate(filters.get("from_date")))
+    if filters.get("to_date"):
+        end = min(end, getdate(filters.get("to_date")))
+    
+    return {"from_date": str(start), "to_date": str(end)}
+
 def get_filters():
     return [
         {
@@ -175,6 +311,18 @@ def get_filters():
             "fieldtype": "Link",
             "options": "Employee"
         },
+        {
+            "fieldname": "task",
+            "label": "Task",
+            "fieldtype": "Link",
+            "options": "Task"
+        },
+        {
+            "fieldname": "activity_type",
+            "label": "Activity Type",
+            "fieldtype": "Link",
+            "options": "Activity Type"
+        },
         {
             "fieldname": "status",
             "label": "Status",
@@ -190,6 +338,11 @@ def get_filters():
             "fieldname": "to_date",
             "label": "To Date",
             "fieldtype": "Date"
+        },
+        {
+            "fieldname": "group_by",
+            "label": "Group By",
+            "fieldtype": "Select",
+            "options": "\nEmployee\nProject\nTask\nActivity Type\nWeek\nMonth"
         }
-    ]
-
+    ]
\ No newline at end of file
@@ -0,0 +1,10 @@
+import frappe
+from frappe.model.document import Document
+
+class ApprovalLatencyStat(Document):
+    """Running time-to-approve statistics of one approver on one project"""
+    pass
+
+def on_doctype_update():
+    # One row per approver and project; each approval updates it
+    frappe.db.add_unique("Approval Latency Stat", ["approver", "project"], constraint_name="unique_approver_project")
@@ -0,0 +1,5 @@
+from frappe.model.document import Document
+
+class ArchivedBillingSummary(Document):
+    """Hour totals of one project, employee and month whose Timesheet Details were archived"""
+    pass
@@ -0,0 +1,5 @@
+from frappe.model.document import Document
+
+class BillingPeriodSnapshot(Document):
+    """Frozen approved billing entries and totals of one project for one closed month"""
+    pass
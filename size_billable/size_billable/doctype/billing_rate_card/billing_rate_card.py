@@ -0,0 +1,26 @@
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import flt, getdate
+
+BLANKABLE_FIELDS = ("project", "activity_type", "designation")
+
+class BillingRateCard(Document):
+    """Hourly billing rate for a project, activity type and designation over an effective date range
+
+    Blank project, activity type or designation apply to all; the most specific card wins.
+    """
+    def validate(self):
+        if flt(self.rate) < 0:
+            frappe.throw(_("Rate cannot be negative"))
+
+        if self.to_date and getdate(self.to_date) < getdate(self.from_date):
+            frappe.throw(_("To Date cannot be before From Date"))
+
+        # Blanks are stored as '' rather than NULL so rate lookups can seek the composite index
+        for fieldname in BLANKABLE_FIELDS:
+            self.set(fieldname, self.get(fieldname) or "")
+
+def on_doctype_update():
+    # Rate resolution filters on these columns and orders by from_date
+    frappe.db.add_index("Billing Rate Card", ["project", "activity_type", "designation", "from_date"])
@@ -0,0 +1,39 @@
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import getdate
+from size_billable.api.approvers import clear_approvable_projects_cache
+
+class ProjectApprover(Document):
+    """A user who may approve a project's timesheet entries, optionally as a delegate for a date range"""
+    def validate(self):
+        if self.from_date and self.to_date and getdate(self.to_date) < getdate(self.from_date):
+            frappe.throw(_("To Date cannot be before From Date"))
+
+        if self.delegated_by and self.delegated_by == self.approver:
+            frappe.throw(_("An approver cannot be their own delegate"))
+
+        project_manager = self.validate_project_manager()
+
+        # A delegation is recorded in the name of the project manager or of whoever creates it
+        if self.delegated_by and self.delegated_by not in (project_manager, frappe.session.user):
+            frappe.throw(_("Delegated By must be the project manager or yourself"))
+
+    def on_update(self):
+        previous = self.get_doc_before_save()
+        clear_approvable_projects_cache([self.approver, previous and previous.approver])
+
+    def on_trash(self):
+        self.validate_project_manager()
+        clear_approvable_projects_cache([self.approver])
+
+    def validate_project_manager(self):
+        """Project managers may only hand off approvals of their own projects; returns the project manager"""
+        project_manager = frappe.db.get_value("Project", self.project, "project_manager_user")
+        if "System Manager" not in frappe.get_roles() and project_manager != frappe.session.user:
+            frappe.throw(_("You can only assign approvers to projects you manage"), frappe.PermissionError)
+        return project_manager
+
+def on_doctype_update():
+    # Approvable projects are looked up per approver and date
+    frappe.db.add_index("Project Approver", ["approver", "from_date", "to_date"])
@@ -0,0 +1,158 @@
+import threading
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, flt, now_datetime
+
+from size_billable.api.project import apply_approval_action, apply_consumed_hours_deltas
+from size_billable.api.timesheet_detail import apply_hour_update
+
+TEST_COMPANY = "_Test Company"
+TEST_ACTIVITY_TYPE = "_Test Activity Type"
+MANAGER = "size-billable-manager@example.com"
+
+# Entries approved by every worker at once, to provoke double approvals
+SHARED_ENTRIES = 10
+ENTRIES_PER_WORKER = 15
+WORKERS = 4
+HOURS = 2
+
+class TestConsumedHoursConcurrency(FrappeTestCase):
+    """Parallel approvals and hour edits on one project must not lose or double-count consumed hours
+
+    Fixtures are committed because every worker thread uses its own database connection.
+    """
+    def setUp(self):
+        self.site = frappe.local.site
+        self.manager = make_project_manager()
+        self.employee = make_employee()
+        self.project = frappe.get_doc({
+            "doctype": "Project",
+            "project_name": f"Concurrency {frappe.generate_hash(length=6)}",
+            "company": TEST_COMPANY,
+            "billing_type": "Hourly Billing",
+            "total_purchased_hours": 100000,
+            "hourly_rate": 100,
+            "project_manager_user": self.manager
+        }).insert(ignore_permissions=True)
+
+        self.timesheets = []
+        self.entries = []
+        start = add_to_date(now_datetime(), days=-400)
+        for i in range(SHARED_ENTRIES + ENTRIES_PER_WORKER * WORKERS):
+            from_time = add_to_date(start, hours=i * 3)
+            timesheet = frappe.get_doc({
+                "doctype": "Timesheet",
+                "company": TEST_COMPANY,
+                "employee": self.employee,
+                "time_logs": [{
+                    "activity_type": TEST_ACTIVITY_TYPE,
+                    "project": self.project.name,
+                    "from_time": from_time,
+                    "to_time": add_to_date(from_time, hours=HOURS),
+                    "hours": HOURS,
+                    "billable_hours": HOURS
+                }]
+            }).insert(ignore_permissions=True)
+            timesheet.submit()
+            self.timesheets.append(timesheet.name)
+            self.entries.append(timesheet.time_logs[0].name)
+
+        frappe.db.commit()
+
+    def tearDown(self):
+        frappe.set_user("Administrator")
+        for name in self.timesheets:
+            timesheet = frappe.get_doc("Timesheet", name)
+            timesheet.cancel()
+            timesheet.delete(ignore_permissions=True)
+        frappe.delete_doc("Project", self.project.name, force=True, ignore_permissions=True)
+        frappe.db.commit()
+
+    def test_parallel_approvals_do_not_lose_updates(self):
+        shared = self.entries[:SHARED_ENTRIES]
+        own = self.entries[SHARED_ENTRIES:]
+        slices = [shared + own[i::WORKERS] for i in range(WORKERS)]
+
+        self.run_workers([lambda names=names: approve(names) for names in slices])
+
+        self.assertEqual(self.get_consumed_hours(), len(self.entries) * HOURS)
+
+    def test_parallel_hour_edits_keep_consumed_hours_exact(self):
+        approve(self.entries)
+        frappe.db.commit()
+
+        # Every worker edits its own entries down to 1 billable hour, twice over
+        slices = [self.entries[i::WORKERS] for i in range(WORKERS)]
+        self.run_workers([lambda names=names: edit_hours(names, 1) for names in slices] * 2)
+
+        self.assertEqual(self.get_consumed_hours(), len(self.entries) * 1)
+
+    def run_workers(self, jobs):
+        errors = []
+
+        def run(job):
+            frappe.init(site=self.site)
+            frappe.connect()
+            try:
+                frappe.set_user(MANAGER)
+                job()
+                frappe.db.commit()
+            except Exception as e:
+                frappe.db.rollback()
+                errors.append(e)
+            finally:
+                frappe.destroy()
+
+        threads = [threading.Thread(target=run, args=(job,)) for job in jobs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertFalse(errors, errors)
+
+    def get_consumed_hours(self):
+        return flt(frappe.db.sql("""
+            SELECT total_consumed_hours FROM `tabProject` WHERE name = %s
+        """, self.project.name)[0][0])
+
+def approve(names):
+    deltas = {}
+    for name in names:
+        apply_approval_action(name, MANAGER, "approve", deltas)
+        # Short transactions, like the chunked background jobs
+        apply_consumed_hours_deltas(deltas)
+        frappe.db.commit()
+        deltas = {}
+
+def edit_hours(names, billable_hours):
+    deltas = {}
+    for name in names:
+        hours = frappe.db.get_value("Timesheet Detail", name, "hours")
+        apply_hour_update(name, {
+            "billable_hours": billable_hours,
+            "non_billable_hours": flt(hours) - billable_hours
+        }, MANAGER, deltas)
+        apply_consumed_hours_deltas(deltas)
+        frappe.db.commit()
+        deltas = {}
+
+def make_project_manager():
+    if not frappe.db.exists("User", MANAGER):
+        frappe.get_doc({
+            "doctype": "User",
+            "email": MANAGER,
+            "first_name": "Size Billable Manager",
+            "send_welcome_email": 0
+        }).insert(ignore_permissions=True)
+
+    user = frappe.get_doc("User", MANAGER)
+    if "Project Manager" not in [row.role for row in user.roles]:
+        user.add_roles("Project Manager")
+    return MANAGER
+
+def make_employee():
+    from erpnext.setup.doctype.employee.test_employee import make_employee as make_test_employee
+
+    return make_test_employee(MANAGER, company=TEST_COMPANY)
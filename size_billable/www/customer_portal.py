@@ -1,9 +1,12 @@
 import frappe
 from frappe import _
+from size_billable.api.customer_portal import get_portal_bootstrap
 
 def get_context(context):
     """Get context for customer portal page"""
     context.title = _("Customer Portal")
+    # The page is per user, so it is never served from the shared page cache;
+    # the expensive part (bootstrap data) is cached per customer instead
     context.no_cache = 1
     
     # Check if user is logged in
@@ -22,4 +25,13 @@ def get_context(context):
     context.customer_name = customer_name
     context.user = frappe.session.user
     
+    # Realtime connection details so the portal can receive approval changes
+    context.realtime_json = frappe.as_json({
+        "site": frappe.local.site,
+        "port": frappe.conf.socketio_port if frappe.conf.developer_mode else None
+    }, indent=None)
+    
+    # Initial state embedded in the page so the first render needs no API calls
+    context.bootstrap_json = frappe.as_json(get_portal_bootstrap(), indent=None).replace("</", "<\\/")
+    
     return context